@@ -9,10 +9,19 @@ import { successResponse } from '@utils/server-responses'
 export const POST = apiWrapper(async (req, { user }) => {
   const { puzzle, setId, last_puzzle } = await req.json()
 
-  if (!puzzle || !setId) {
+  if (!setId || (!puzzle && !last_puzzle)) {
     throw new BadRequest('Missing puzzle or setId')
   }
 
+  // The worker marks a set complete after its last game, whether or not it yielded puzzles
+  if (!puzzle) {
+    await prisma.tacticsSet.update({
+      where: { id: setId, userId: user.id },
+      data: { status: TacticsSetStatus.ACTIVE },
+    })
+    return successResponse('Set completed', {})
+  }
+
   const parsedRating = Number.isFinite(Number(puzzle.rating))
     ? Number(puzzle.rating)
     : 1500
@@ -60,7 +69,12 @@ export const POST = apiWrapper(async (req, { user }) => {
   await prisma.tacticsSet.update({
     where: { id: setId, userId: user.id },
     data: {
-      puzzles: { create: { puzzleid: puzzle.id } },
+      puzzles: {
+        create: {
+          puzzleid: puzzle.id,
+          tier: typeof puzzle.tier === 'string' ? puzzle.tier : null,
+        },
+      },
       size: { increment: 1 },
       status: nextStatus,
     },
@@ -1,4 +1,5 @@
 import Redis from 'ioredis'
+import { gzipSync } from 'node:zlib'
 import { env } from '~/env'
 
 let redis: Redis | null = null
@@ -20,6 +21,10 @@ function getRedis(): Redis {
   return redis
 }
 
+const PGN_QUEUE = 'pgn_queue'
+// The worker deletes an upload once its job is done; this only covers lost jobs
+const PGN_TTL_SECONDS = 7 * 24 * 3600
+
 type PgnPayload = {
   pgn: string
   userId: string
@@ -28,7 +33,17 @@ type PgnPayload = {
 
 export async function publishPgnToRedis(payload: PgnPayload) {
   const redisClient = getRedis()
-  await redisClient.lpush('pgn_queue', JSON.stringify(payload))
+  // The job only references the upload, which is stored once and compressed,
+  // so queue operations stay cheap whatever the size of the PGN
+  const pgnKey = `${PGN_QUEUE}:pgn:${payload.setId}`
+  await redisClient
+    .multi()
+    .set(pgnKey, gzipSync(payload.pgn), 'EX', PGN_TTL_SECONDS)
+    .lpush(
+      PGN_QUEUE,
+      JSON.stringify({ pgnKey, userId: payload.userId, setId: payload.setId }),
+    )
+    .exec()
 }
 
 export default getRedis()
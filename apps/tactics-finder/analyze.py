@@ -1,24 +1,69 @@
 import argparse
-from typing import Optional, Dict
+import json
+import random
+import time
+from typing import Any, Optional, Dict
 
 from tqdm import tqdm
 
+from modules.archive import ArchiveWriter
 from modules.configuration import load_configuration
 from modules.converter import convert
-from modules.finder.analyzer import Analyzer
+from modules.finder.analysis_store import AnalysisStore, StoredEngine
+from modules.finder.analyzer import Analyzer, create_stockfish
+from modules.finder.replay import RecordingEngine, ReplayEngine
+from modules.tracing import start_trace, stop_trace
 
 configuration: Dict = load_configuration()
 STOCKFISH_DEPTH: int = configuration["stockfish"]["depth"]
 
-def analyze_pgn(pgn_content: str, stockfish_depth: int = STOCKFISH_DEPTH, user_id: Optional[int] = None) -> None:
-    """Analyze PGN content string and find tactics in memory."""
+def analyze_pgn(
+    pgn_content: str,
+    stockfish_depth: int = STOCKFISH_DEPTH,
+    user_id: Optional[str] = None,
+    record_path: Optional[str] = None,
+    replay_path: Optional[str] = None,
+    store_path: Optional[str] = None,
+    thresholds: Optional[dict] = None,
+    archive_path: Optional[str] = None,
+) -> None:
+    """
+    Analyze PGN content string and find tactics in memory.
+
+    With `record_path` every engine answer is saved there; with `replay_path` the
+    engine answers come from such a recording instead of Stockfish. With `store_path`
+    the answers are kept by position in an analysis store, which later runs under
+    other `thresholds` re-mine, searching only the positions it lacks. With
+    `archive_path` every tactic is archived there with its search tree.
+    """
     name: str
     game_pgn_strings: list[str]
     name, game_pgn_strings = convert(pgn_content)
 
+    # Stockfish, or one of the engines that stand in for it
+    engine: Any = None
+    store = None
+    if replay_path:
+        engine = ReplayEngine.load(replay_path)
+    elif record_path:
+        engine = RecordingEngine(create_stockfish(stockfish_depth))
+    elif store_path:
+        store = AnalysisStore.open(store_path)
+        store.pgn = store.pgn or pgn_content
+        engine = StoredEngine(store, create_stockfish, stockfish_depth)
+
+    archive_file = open(archive_path, "wb") if archive_path else None
+    archive = ArchiveWriter(archive_file) if archive_file else None
+
     with tqdm(game_pgn_strings) as bar:
         for game_pgn_string in bar:
-            analyzer = Analyzer(user_id=user_id)
+            analyzer = Analyzer(
+                user_id=user_id,
+                stockfish=engine,
+                stockfish_depth=stockfish_depth,
+                search_options=thresholds,
+                archive=archive,
+            )
             try:
                 analyzer(game_pgn_string)
             except KeyboardInterrupt:
@@ -28,6 +73,110 @@ def analyze_pgn(pgn_content: str, stockfish_depth: int = STOCKFISH_DEPTH, user_i
                 print("Stockfish is not properly installed.")
                 break
 
+    if archive_file is not None:
+        archive_file.close()
+    if engine is not None:
+        print(engine)
+    if record_path and isinstance(engine, RecordingEngine):
+        engine.save(record_path)
+    if store_path and store is not None:
+        store.save(store_path)
+
+
+def compare_search_options(
+    pgn_content: str,
+    modes: dict[str, dict],
+    stockfish_depth: int = STOCKFISH_DEPTH,
+    thresholds: Optional[dict] = None,
+) -> None:
+    """
+    Analyze every game once per mode and report engine calls, skipped plies, time and
+    the tactics each mode loses against the first one, the full search.
+
+    Each mode has its own engine, whose Hash is cleared before every game, and the
+    modes take turns in random order, so none times another's cache.
+    """
+    name, game_pgn_strings = convert(pgn_content)
+    engines = {mode: create_stockfish(stockfish_depth) for mode in modes}
+    engine_calls = {mode: 0 for mode in modes}
+    skipped_plies = {mode: 0 for mode in modes}
+    seconds = {mode: 0.0 for mode in modes}
+    puzzles: dict[str, set[tuple[str, str]]] = {mode: set() for mode in modes}
+
+    for game_pgn_string in tqdm(game_pgn_strings):
+        for mode in random.sample(list(modes), len(modes)):
+            search_options = {**(thresholds or {}), **modes[mode]}
+            engines[mode].send_ucinewgame_command()
+            analyzer = Analyzer(
+                stockfish=engines[mode], stockfish_depth=stockfish_depth, search_options=search_options
+            )
+            tracer = start_trace()
+            started = time.monotonic()
+            puzzle_list = analyzer(game_pgn_string) or []
+            seconds[mode] += time.monotonic() - started
+            stop_trace()
+            engine_calls[mode] += sum(1 for event in tracer.events if event["cat"] == "engine")
+            skipped_plies[mode] += sum(
+                1
+                for event in tracer.events
+                if event["name"] == "ply" and (event["args"].get("decided") or event["args"].get("quiet"))
+            )
+            puzzles[mode].update((puzzle["fen"], puzzle["moves"]) for puzzle in puzzle_list)
+
+    for mode in modes:
+        print(
+            f"{mode}: {engine_calls[mode]} engine calls, {skipped_plies[mode]} plies skipped, "
+            f"{seconds[mode]:.1f}s, {len(puzzles[mode])} puzzles"
+        )
+    full_search, *shortcuts = modes
+    for mode in shortcuts:
+        missed = puzzles[full_search] - puzzles[mode]
+        print(f"{mode} lost {len(missed)} of {len(puzzles[full_search])} puzzles")
+        for fen, moves in sorted(missed):
+            print(f"  {fen} {moves}")
+
+
+def compare_screening(
+    pgn_content: str, stockfish_depth: int = STOCKFISH_DEPTH, thresholds: Optional[dict] = None
+) -> None:
+    """Measure the board-only screening of forced nodes and quiet plies against the full search."""
+    modes = {
+        "full search": {"screen_forced_nodes": False, "screen_quiet_plies": False},
+        "screened": {"screen_forced_nodes": True, "screen_quiet_plies": True},
+    }
+    compare_search_options(pgn_content, modes, stockfish_depth, thresholds)
+
+
+def compare_gating(
+    pgn_content: str, stockfish_depth: int = STOCKFISH_DEPTH, thresholds: Optional[dict] = None
+) -> None:
+    """
+    Measure the gate on decided plies against the full search. The gate can drop
+    tactics, see TacticFinder.is_decided, so it is off unless this shows it pays off.
+    """
+    modes = {
+        "full search": {"gate_decided_plies": False},
+        "gated": {"gate_decided_plies": True},
+    }
+    compare_search_options(pgn_content, modes, stockfish_depth, thresholds)
+
+
+def parse_thresholds(settings: list[str]) -> dict:
+    """`name=value` overrides of the `algorithm` settings, such as `centipawn_threshold=200`."""
+    thresholds = {}
+    for setting in settings:
+        name, _, value = setting.partition("=")
+        if name not in configuration["algorithm"] or not value:
+            raise argparse.ArgumentTypeError(
+                f"expected one of {', '.join(configuration['algorithm'])} as name=value, got {setting!r}"
+            )
+        try:
+            thresholds[name] = json.loads(value)
+        except json.JSONDecodeError:
+            raise argparse.ArgumentTypeError(f"{name} needs a number, got {value!r}")
+    return thresholds
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         prog="ChessTacticFinder",
@@ -36,8 +185,42 @@ if __name__ == "__main__":
 
     parser.add_argument("pgn", type=str, nargs="?", help="PGN content as string or path to file.")
     parser.add_argument("--depth", "-d", type=int, help="Stockfish depth", default=STOCKFISH_DEPTH)
-    parser.add_argument("--user_id", "-u", type=int, help="User ID", default=None)
+    parser.add_argument("--user_id", "-u", type=str, help="User ID", default=None)
+    replay_group = parser.add_mutually_exclusive_group()
+    replay_group.add_argument("--record", type=str, help="Save every engine answer to this file", default=None)
+    replay_group.add_argument("--replay", type=str, help="Answer from a recording instead of Stockfish", default=None)
+    replay_group.add_argument(
+        "--store", type=str, help="Keep engine answers by position in this analysis store", default=None
+    )
+    replay_group.add_argument(
+        "--remine", type=str, help="Re-mine the games of an analysis store under new thresholds", default=None
+    )
+    parser.add_argument(
+        "--archive", type=str, help="Archive every tactic and its search tree to this file", default=None
+    )
+    parser.add_argument(
+        "--set",
+        dest="thresholds",
+        action="append",
+        metavar="NAME=VALUE",
+        help="Override an algorithm setting, e.g. --set centipawn_threshold=200",
+        default=[],
+    )
+    parser.add_argument(
+        "--compare-screening",
+        action="store_true",
+        help="Measure the board-only screening against the full search on these games",
+    )
+    parser.add_argument(
+        "--compare-gating",
+        action="store_true",
+        help="Measure the gate on decided plies against the full search on these games",
+    )
     args = parser.parse_args()
+    try:
+        thresholds = parse_thresholds(args.thresholds)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
 
     pgn_content = args.pgn or ""
     
@@ -50,7 +233,22 @@ if __name__ == "__main__":
             print(f"File not found: {pgn_content}")
             exit(1)
 
-    if pgn_content:
-        analyze_pgn(pgn_content, args.depth, args.user_id)
+    store_path = args.store
+    if args.remine:
+        store_path = args.remine
+        try:
+            pgn_content = pgn_content or AnalysisStore.load(args.remine).pgn
+        except FileNotFoundError:
+            print(f"Analysis store not found: {args.remine}")
+            exit(1)
+
+    if pgn_content and args.compare_screening:
+        compare_screening(pgn_content, args.depth, thresholds)
+    elif pgn_content and args.compare_gating:
+        compare_gating(pgn_content, args.depth, thresholds)
+    elif pgn_content:
+        analyze_pgn(
+            pgn_content, args.depth, args.user_id, args.record, args.replay, store_path, thresholds, args.archive
+        )
     else:
         print("No PGN content provided")
\ No newline at end of file
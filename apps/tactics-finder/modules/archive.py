@@ -0,0 +1,97 @@
+import zlib
+from typing import BinaryIO, Iterable, Iterator, Union
+
+from modules.binary import BinaryWriter
+from modules.structures.tactic import Tactic
+from modules.structures.variations import Variations
+
+ARCHIVE_MAGIC = b"CTFA"
+ARCHIVE_VERSION = 1
+
+VARIATIONS_RECORD = 1
+TACTIC_RECORD = 2
+
+COMPRESSED_FLAG = 1
+
+Record = Union[Variations, Tactic]
+
+
+class ArchiveError(ValueError):
+    pass
+
+
+def read_varint(file: BinaryIO) -> int:
+    result = 0
+    shift = 0
+    while True:
+        byte = file.read(1)
+        if not byte:
+            raise ArchiveError("truncated record length")
+        result |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            return result
+        shift += 7
+
+
+class ArchiveWriter:
+    """
+    Appends variation trees and tactics to a binary archive.
+
+    The file starts with a magic and a format version, followed by records of
+    (kind, flags, payload length, payload); payloads are zlib-compressed by default.
+    """
+
+    def __init__(self, file: BinaryIO, compress: bool = True):
+        self.file = file
+        self.compress = compress
+        self.file.write(ARCHIVE_MAGIC + bytes([ARCHIVE_VERSION]))
+
+    def write(self, record: Record) -> None:
+        if isinstance(record, Variations):
+            kind = VARIATIONS_RECORD
+        elif isinstance(record, Tactic):
+            kind = TACTIC_RECORD
+        else:
+            raise TypeError(f"cannot archive {type(record).__name__}")
+
+        payload = record.to_binary()
+        flags = 0
+        if self.compress:
+            payload = zlib.compress(payload)
+            flags |= COMPRESSED_FLAG
+        writer = BinaryWriter()
+        writer.write_byte(kind)
+        writer.write_byte(flags)
+        writer.write_varint(len(payload))
+        self.file.write(writer.getvalue() + payload)
+
+    def write_all(self, records: Iterable[Record]) -> None:
+        for record in records:
+            self.write(record)
+
+
+def read_archive(file: BinaryIO) -> Iterator[Record]:
+    """Yield records one at a time so archives larger than memory can be scanned."""
+    header = file.read(len(ARCHIVE_MAGIC) + 1)
+    if header[:len(ARCHIVE_MAGIC)] != ARCHIVE_MAGIC:
+        raise ArchiveError("not a tactics archive")
+    if header[-1] > ARCHIVE_VERSION:
+        raise ArchiveError(f"unsupported archive version {header[-1]}")
+
+    while record_header := file.read(2):
+        if len(record_header) < 2:
+            raise ArchiveError("truncated record header")
+        kind, flags = record_header
+        length = read_varint(file)
+        payload = file.read(length)
+        if len(payload) < length:
+            raise ArchiveError("truncated record payload")
+        if flags & COMPRESSED_FLAG:
+            payload = zlib.decompress(payload)
+
+        if kind == VARIATIONS_RECORD:
+            yield Variations.from_binary(payload)
+        elif kind == TACTIC_RECORD:
+            yield Tactic.from_binary(payload)
+        else:
+            raise ArchiveError(f"unknown record kind {kind}")
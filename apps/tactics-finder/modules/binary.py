@@ -0,0 +1,99 @@
+import struct
+from typing import Optional
+
+from chess.pgn import TAG_ROSTER, Headers
+
+FLOAT_FORMAT = struct.Struct("<d")
+
+
+class BinaryWriter:
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def write_varint(self, value: int) -> None:
+        if value < 0:
+            raise ValueError("varint cannot be negative")
+        while value >= 0x80:
+            self.buffer.append((value & 0x7F) | 0x80)
+            value >>= 7
+        self.buffer.append(value)
+
+    def write_signed(self, value: int) -> None:
+        self.write_varint(value * 2 if value >= 0 else -value * 2 - 1)
+
+    def write_byte(self, value: int) -> None:
+        self.buffer.append(value)
+
+    def write_float(self, value: float) -> None:
+        self.buffer += FLOAT_FORMAT.pack(value)
+
+    def write_string(self, value: str) -> None:
+        encoded = value.encode("utf-8")
+        self.write_varint(len(encoded))
+        self.buffer += encoded
+
+    def write_headers(self, headers: Optional[Headers]) -> None:
+        if headers is None:
+            self.write_byte(0)
+            return
+        self.write_byte(1)
+        # The seven-tag roster first, then the other tags, both in the order Headers keeps them
+        roster = [(key, value) for key, value in headers.items() if key in TAG_ROSTER]
+        others = [(key, value) for key, value in headers.items() if key not in TAG_ROSTER]
+        for tags in (roster, others):
+            self.write_varint(len(tags))
+            for key, value in tags:
+                self.write_string(key)
+                self.write_string(value)
+
+    def getvalue(self) -> bytes:
+        return bytes(self.buffer)
+
+
+class BinaryReader:
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def read_varint(self) -> int:
+        result = 0
+        shift = 0
+        while True:
+            byte = self.data[self.offset]
+            self.offset += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    def read_signed(self) -> int:
+        value = self.read_varint()
+        return value // 2 if value % 2 == 0 else -(value + 1) // 2
+
+    def read_byte(self) -> int:
+        byte = self.data[self.offset]
+        self.offset += 1
+        return byte
+
+    def read_float(self) -> float:
+        (value,) = FLOAT_FORMAT.unpack_from(self.data, self.offset)
+        self.offset += FLOAT_FORMAT.size
+        return value
+
+    def read_string(self) -> str:
+        length = self.read_varint()
+        value = bytes(self.data[self.offset:self.offset + length]).decode("utf-8")
+        self.offset += length
+        return value
+
+    def read_headers(self) -> Optional[Headers]:
+        if self.read_byte() == 0:
+            return None
+        headers = Headers()
+        # Headers() starts with the whole roster, which the written headers may lack
+        headers.clear()
+        for _ in range(2):
+            for _ in range(self.read_varint()):
+                key = self.read_string()
+                headers[key] = self.read_string()
+        return headers
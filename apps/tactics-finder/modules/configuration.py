@@ -4,13 +4,19 @@ from modules.json import json_load, json_save
 
 CONFIGURATION_PATH = "configuration.json"
 
+# Every module loads the configuration at import time; parse each file once per process
+loaded_configurations: Dict[str, Dict[str, Any]] = {}
+
 
 def load_configuration(path: str = CONFIGURATION_PATH) -> Dict[str, Any]:
-    return cast(Dict[str, Any], json_load(path))
+    if path not in loaded_configurations:
+        loaded_configurations[path] = cast(Dict[str, Any], json_load(path))
+    return loaded_configurations[path]
 
 
 def save_configuration(configuration: Dict[str, Any], path: str = CONFIGURATION_PATH) -> None:
     json_save(configuration, path)
+    loaded_configurations[path] = configuration
 
 
 def set_field(key: str, value: Any, path: str = CONFIGURATION_PATH) -> None:
@@ -30,4 +36,4 @@ def set_field(key: str, value: Any, path: str = CONFIGURATION_PATH) -> None:
 
     new_value = type(configuration_part[key])(value)
     configuration_part[key] = new_value
-    json_save(configuration, path)
+    save_configuration(configuration, path)
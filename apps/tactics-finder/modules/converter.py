@@ -1,7 +1,8 @@
 import hashlib
 import re
 import subprocess
-from typing import Dict, Tuple, Any, Union, List
+from dataclasses import dataclass, field
+from typing import Dict, Tuple, Any, Union, List, Optional
 
 import chess
 import chess.pgn
@@ -17,6 +18,58 @@ if not isinstance(configuration, dict):
 
 PGN_EXTRACT_PATH: str = configuration["paths"]["pgn_extract"]
 
+@dataclass
+class GameRecord:
+    """The mainline of a game: what the analyzer needs, without the move tree of a chess.pgn.Game."""
+    moves: list[str]
+    headers: chess.pgn.Headers
+    starting_position: str = ""
+    errors: list[Exception] = field(default_factory=list)
+
+
+class MainlineVisitor(chess.pgn.BaseVisitor[GameRecord]):
+    """
+    Reads a game straight into a GameRecord.
+
+    Variations are skipped before their moves are parsed, and comments and NAGs are
+    dropped, so the PGN is parsed once and no move tree is built.
+    """
+
+    def begin_game(self) -> None:
+        self.headers = chess.pgn.Headers()
+        self.moves: list[str] = []
+        self.errors: list[Exception] = []
+
+    def begin_headers(self) -> chess.pgn.Headers:
+        return self.headers
+
+    def visit_header(self, tagname: str, tagvalue: str) -> None:
+        self.headers[tagname] = tagvalue
+
+    def visit_result(self, result: str) -> None:
+        # Like chess.pgn.GameBuilder: the movetext result stands in for a missing Result tag
+        if self.headers.get("Result", "*") == "*":
+            self.headers["Result"] = result
+
+    def begin_variation(self) -> chess.pgn.SkipType:
+        return chess.pgn.SKIP
+
+    def visit_move(self, board: chess.Board, move: chess.Move) -> None:
+        self.moves.append(move.uci())
+
+    def handle_error(self, error: Exception) -> None:
+        # Like chess.pgn.GameBuilder: keep the moves read so far instead of losing the game
+        self.errors.append(error)
+
+    def result(self) -> GameRecord:
+        return GameRecord(self.moves, self.headers, self.headers.get("FEN", ""), self.errors)
+
+
+def read_game_record(handle) -> Optional[GameRecord]:
+    """Read the next game of an open PGN text stream as a GameRecord, or None at the end."""
+    return chess.pgn.read_game(handle, Visitor=MainlineVisitor)
+
+
 def create_game_from_board(headers: chess.pgn.Headers, board: chess.Board) -> chess.pgn.Game:
     """Create a chess.pgn.Game from a board position and headers."""
     game = chess.pgn.Game.from_board(board)
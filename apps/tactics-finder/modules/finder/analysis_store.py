@@ -0,0 +1,138 @@
+import gzip
+import json
+import os
+from typing import Any, Callable, Optional
+
+import chess
+
+STORE_VERSION = 1
+
+
+class AnalysisStore:
+    """
+    Engine answers by position, kept with the PGN they were searched for.
+
+    Positions are keyed by FEN and answers by query (method, depth and arguments), so a
+    run under other `algorithm` thresholds finds every position it shares with an
+    earlier run, however the search reached it.
+    """
+
+    def __init__(self, positions: Optional[dict[str, dict[str, Any]]] = None, pgn: str = ""):
+        self.positions: dict[str, dict[str, Any]] = {} if positions is None else positions
+        self.pgn = pgn
+
+    @staticmethod
+    def load(path: str) -> "AnalysisStore":
+        with gzip.open(path, "rt") as file:
+            stored = json.load(file)
+        if stored.get("version") != STORE_VERSION:
+            raise ValueError(f"unsupported analysis store version {stored.get('version')}")
+        return AnalysisStore(stored["positions"], stored["pgn"])
+
+    @staticmethod
+    def open(path: str) -> "AnalysisStore":
+        """The store at `path`, or an empty one when there is none yet."""
+        return AnalysisStore.load(path) if os.path.exists(path) else AnalysisStore()
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with gzip.open(path, "wt") as file:
+            json.dump({"version": STORE_VERSION, "pgn": self.pgn, "positions": self.positions}, file)
+
+    def get(self, fen: str, query: str) -> Any:
+        return self.positions.get(fen, {}).get(query)
+
+    def put(self, fen: str, query: str, answer: Any) -> None:
+        self.positions.setdefault(fen, {})[query] = answer
+
+    def get_top_moves(self, fen: str, depth: int, num_top_moves: int) -> Optional[list[dict]]:
+        """
+        Top moves of a position, cut from a search of more lines when this count was never asked for.
+        The extra lines change the search a little, which re-mining accepts instead of a new search.
+        """
+        top_moves = self.get(fen, f"top_moves:{depth}:{num_top_moves}")
+        if top_moves is not None:
+            return top_moves
+        prefix = f"top_moves:{depth}:"
+        wider = [
+            int(query[len(prefix):])
+            for query in self.positions.get(fen, {})
+            if query.startswith(prefix) and int(query[len(prefix):]) > num_top_moves
+        ]
+        if not wider:
+            return None
+        return self.get(fen, f"{prefix}{min(wider)}")[:num_top_moves]
+
+    def __repr__(self):
+        answers = sum(len(queries) for queries in self.positions.values())
+        return f"AnalysisStore({len(self.positions)} positions, {answers} answers)"
+
+
+class StoredEngine:
+    """
+    Stands in for Stockfish by answering from an analysis store.
+
+    Positions are tracked on a python-chess board, so a stored answer costs no engine
+    round trip at all. The engine is only launched for the first position the store
+    lacks, and its answers are added to the store.
+    """
+
+    def __init__(self, store: AnalysisStore, create_engine: Callable[[int], Any], depth: int = 15):
+        self.store = store
+        self.create_engine = create_engine
+        self.engine: Any = None
+        self.depth = depth
+        self.board = chess.Board()
+        self.hits = 0
+        self.misses = 0
+
+    def set_depth(self, depth: int = 15) -> None:
+        self.depth = depth
+
+    def get_depth(self) -> int:
+        return self.depth
+
+    def send_ucinewgame_command(self) -> None:
+        if self.engine is not None:
+            self.engine.send_ucinewgame_command()
+
+    def set_fen_position(self, fen_position: str, do_validation: bool = True) -> None:
+        self.board = chess.Board(fen_position)
+
+    def make_moves_from_current_position(self, moves: Optional[list[str]]) -> None:
+        for move in moves or []:
+            self.board.push_uci(move)
+
+    def get_fen_position(self) -> str:
+        return self.board.fen()
+
+    def search(self, query: str, stored: Any, method: str, *args) -> Any:
+        if stored is not None:
+            self.hits += 1
+            return stored
+        self.misses += 1
+        if self.engine is None:
+            self.engine = self.create_engine(self.depth)
+        if self.engine.get_depth() != self.depth:
+            self.engine.set_depth(self.depth)
+        self.engine.set_fen_position(self.board.fen())
+        answer = getattr(self.engine, method)(*args)
+        self.store.put(self.board.fen(), query, answer)
+        return answer
+
+    def get_evaluation(self) -> dict:
+        query = f"evaluation:{self.depth}"
+        return self.search(query, self.store.get(self.board.fen(), query), "get_evaluation")
+
+    def get_top_moves(self, num_top_moves: int = 5) -> list[dict]:
+        query = f"top_moves:{self.depth}:{num_top_moves}"
+        stored = self.store.get_top_moves(self.board.fen(), self.depth, num_top_moves)
+        return self.search(query, stored, "get_top_moves", num_top_moves)
+
+    def get_top_moves_mate(self, num_top_moves: int, mate: int, depth: int) -> list[dict]:
+        query = f"top_moves_mate:{depth}:{num_top_moves}:{mate}"
+        stored = self.store.get(self.board.fen(), query)
+        return self.search(query, stored, "get_top_moves_mate", num_top_moves, mate, depth)
+
+    def __repr__(self):
+        return f"StoredEngine({self.hits} answers from the store, {self.misses} from the engine, {self.store})"
@@ -1,20 +1,25 @@
 import os
 import requests
-from typing import Optional, List, Tuple
+from typing import Iterator, Optional, List, Tuple
 import io
 
 from chess import Board
 from chess.pgn import Headers, Game
-import chess.pgn
 from stockfish import Stockfish
 
+from modules.archive import ArchiveWriter
 from modules.configuration import load_configuration
-from modules.converter import uci_to_san
+from modules.converter import GameRecord, read_game_record
+from modules.finder.mate_search import MateSearchStockfish
+from modules.finder.move_trie import MoveTrie, TrieNode
+from modules.finder.screening import screen_plies
+from modules.finder.search_memo import SearchMemo
 from modules.finder.tactic_finder import TacticFinder
 from modules.structures.evaluation import Evaluation
 from modules.structures.position import Position
 from modules.structures.tactic import Tactic
 from modules.structures.variations import Variations
+from modules.tracing import get_search_nodes, get_tracer
 
 configuration = load_configuration()
 
@@ -23,8 +28,6 @@ print(f"Using Stockfish binary at: {STOCKFISH_PATH}")
 
 STOCKFISH_DEPTH = configuration["stockfish"]["depth"]
 STOCKFISH_PARAMETERS = configuration["stockfish"]["parameters"]
-sf_threads = int(os.getenv("STOCKFISH_THREADS", STOCKFISH_PARAMETERS.get("Threads", 2)))
-STOCKFISH_PARAMETERS["Threads"] = sf_threads
 
 STOCKFISH_TOP_MOVES = configuration["stockfish"]["top_moves"]
 
@@ -32,60 +35,180 @@ IGNORE_FIRST_MOVE = configuration["export"]["ignore_first_move"]
 SAVE_LAST_OPPONENT_MOVE = configuration["export"]["save_last_opponent_move"]
 
 
+def get_stockfish_parameters() -> dict:
+    """Engine parameters with the thread count and Hash size chosen by the worker supervisor."""
+    parameters = dict(STOCKFISH_PARAMETERS)
+    parameters["Threads"] = int(os.getenv("STOCKFISH_THREADS", parameters.get("Threads", 2)))
+    parameters["Hash"] = int(os.getenv("STOCKFISH_HASH", parameters.get("Hash", 16)))
+    return parameters
+
+
+def create_stockfish(stockfish_depth: int = STOCKFISH_DEPTH) -> MateSearchStockfish:
+    return MateSearchStockfish(
+        path=STOCKFISH_PATH,
+        depth=stockfish_depth,
+        parameters=get_stockfish_parameters()
+    )
+
+
+def quit_stockfish(stockfish: Stockfish) -> None:
+    """Stop an engine that is being replaced; one that has crashed has nothing left to stop."""
+    try:
+        stockfish.send_quit_command()
+    except Exception as e:
+        print(f"Could not quit Stockfish: {e}")
+
+
 class Analyzer:
-    def __init__(self, user_id: Optional[int] = None):
+    def __init__(
+        self,
+        user_id: Optional[str] = None,
+        stockfish: Optional[Stockfish] = None,
+        trie: Optional[MoveTrie] = None,
+        stockfish_depth: int = STOCKFISH_DEPTH,
+        search_options: Optional[dict] = None,
+        archive: Optional[ArchiveWriter] = None,
+    ):
         self.user_id = user_id
-        
+        # A long-lived engine can be handed in so it is not relaunched for every game
+        self.stockfish = stockfish
+        # Games analyzed with the same trie share the plies of their common prefixes
+        self.trie = trie
+        # Depth and TacticFinder options of the job's quality tier
+        self.stockfish_depth = stockfish_depth
+        self.search_options = search_options or {}
+        # Every tactic found is also written there with the search tree it came from
+        self.archive = archive
+
     def find_variations(
         self,
         moves: list[str],
         starting_position: str,
         headers: Headers,
-        stockfish_depth: int = STOCKFISH_DEPTH,
+        stockfish_depth: Optional[int] = None,
     ) -> tuple[list[Variations], list[Tactic]]:
         """Find tactical variations from a list of moves."""
-        stockfish = Stockfish(
-            path=STOCKFISH_PATH,
-            depth=stockfish_depth,
-            parameters=STOCKFISH_PARAMETERS
-        )
-
-        if starting_position:
-            board = Board(starting_position)
-            stockfish.set_fen_position(starting_position)
-        else:
-            board = Board()
-
         variations_list: list[Variations] = []
         tactic_list: list[Tactic] = []
-        fens: set[str] = set()
+        for variations, tactic in self.iter_variations(moves, starting_position, headers, stockfish_depth):
+            self.archive_tactic(variations, tactic)
+            variations_list.append(variations)
+            tactic_list.append(tactic)
+        return variations_list, tactic_list
+
+    def archive_tactic(self, variations: Variations, tactic: Tactic) -> None:
+        if self.archive is not None:
+            self.archive.write_all([variations, tactic])
+
+    def iter_variations(
+        self,
+        moves: list[str],
+        starting_position: str,
+        headers: Headers,
+        stockfish_depth: Optional[int] = None,
+    ) -> Iterator[tuple[Variations, Tactic]]:
+        """Yield each tactic with its variations as soon as the ply it starts from is analyzed."""
+        if stockfish_depth is None:
+            stockfish_depth = self.stockfish_depth
+        if self.stockfish is None:
+            stockfish = create_stockfish(stockfish_depth)
+        else:
+            stockfish = self.stockfish
+            stockfish.set_depth(stockfish_depth)
+            stockfish.send_ucinewgame_command()
+
+        board = Board(starting_position) if starting_position else Board()
+        trie = MoveTrie() if self.trie is None else self.trie
+        memo = trie.memo
+        node = trie.get_root(starting_position, stockfish_depth)
+        # The engine is only moved to the game's position when a ply has to be analyzed
+        synced = False
 
-        evaluation = Evaluation.from_evaluation(stockfish.get_evaluation())
+        if node.evaluation is None:
+            stockfish.set_fen_position(starting_position or board.fen())
+            synced = True
+            node.fen = stockfish.get_fen_position()
+            node.evaluation = Evaluation.from_evaluation(stockfish.get_evaluation())
+
+        evaluation = node.evaluation
+        fens: set[str] = set()
+        screens = screen_plies(moves, starting_position)
         for idx, move in enumerate(moves):
-            move_number = (idx + 1 - int(board.turn)) // 2 + 1
             white = board.turn
 
-            fen = stockfish.get_fen_position()
+            child = node.children.get(move)
+            if child is not None:
+                # Another game of the set already analyzed this ply after the same moves
+                trie.reused_plies += 1
+                fens |= child.visited_fens
+                evaluation = child.evaluation
+                board.push_uci(move)
+                node = child
+                synced = False
+                yield from child.get_result(headers)
+                continue
+
+            with get_tracer().span("ply", "analysis", ply=idx, move=move) as span:
+                fen = node.fen
+                assert fen is not None, "trie node without a position"
+                if not synced:
+                    stockfish.set_fen_position(fen)
 
-            position = Position(move=move, color=not white, evaluation=evaluation, fen=fen)
+                position = Position(move=move, color=not white, evaluation=evaluation, fen=fen)
 
-            stockfish.make_moves_from_current_position([move])
-            evaluation = Evaluation.from_evaluation(stockfish.get_evaluation())
-            board_move = uci_to_san(board, move)
-            board.push_san(move)
+                stockfish.make_moves_from_current_position([move])
+                next_fen = stockfish.get_fen_position()
+                evaluation = self.get_evaluation(stockfish, memo, next_fen)
+                board.push_uci(move)
 
-            move_string = f'{move_number}{"." if white else "..."} {board_move} {"   " if white else " "}'
+                tactic_finder = TacticFinder(
+                    stockfish, not white, starting_position=position, fens=fens, memo=memo, **self.search_options
+                )
+                if tactic_finder.is_decided(evaluation, board):
+                    # Lopsided plies cost only their mainline evaluation
+                    variations, tactic = None, None
+                    visited_fens = {next_fen}
+                    trie.gated_plies += 1
+                    span["decided"] = True
+                elif tactic_finder.is_quiet(evaluation, screens[idx]):
+                    variations, tactic = None, None
+                    visited_fens = {next_fen}
+                    trie.screened_plies += 1
+                    span["quiet"] = True
+                else:
+                    variations, tactic = tactic_finder.get_variations(headers=headers)
+                    visited_fens = tactic_finder.visited_fens
+                    trie.analyzed_plies += 1
+                fens = fens.union(visited_fens)
 
-            tactic_finder = TacticFinder(stockfish, not white, starting_position=position, fens=fens)
-            variations, tactic = tactic_finder.get_variations(headers=headers)
-            fens = fens.union(tactic_finder.visited_fens)
+                found = bool(tactic and variations)
+                child = node.children[move] = TrieNode(
+                    fen=next_fen,
+                    evaluation=evaluation,
+                    visited_fens=frozenset(visited_fens),
+                    variations=variations if found else None,
+                    tactic=tactic if found else None,
+                )
+                node = child
+                # A search cut short by an earlier position can leave the engine deep in its tree
+                stockfish.set_fen_position(next_fen)
+                synced = True
+                span["tactic"] = found
 
-            if tactic and variations:
-                tactic_list.append(tactic)
-                variations_list.append(variations)
+            if found:
                 print(f"Tactic:\n{tactic}")
-                
-        return variations_list, tactic_list
+                yield from child.get_result(headers)
+
+    def get_evaluation(self, stockfish: Stockfish, memo: SearchMemo, fen: str) -> Evaluation:
+        """Mainline evaluation, reusing an earlier ply's search of the same position when there is one."""
+        evaluation = memo.get_evaluation(fen)
+        if evaluation is None:
+            tracer = get_tracer()
+            with tracer.span("engine evaluation", "engine", depth=stockfish.get_depth()) as span:
+                evaluation = Evaluation.from_evaluation(stockfish.get_evaluation())
+                if tracer.enabled:
+                    span["nodes"] = get_search_nodes(stockfish, "get_evaluation")
+        return evaluation
 
     def extract_puzzle_data(
         self,
@@ -100,43 +223,32 @@ class Analyzer:
         puzzle_data_list = []
         
         for index, (variations, tactic) in enumerate(list(zip(variations_list, tactic_list))):
-            # Extract FEN (starting position of the tactic)
-            fen = tactic.fen
-            
-            # Extract moves in SAN notation
-            moves = []
-            for position in tactic.positions:
-                if position.move:
-                    moves.append(position.move)
-            
-            # Create comma-separated moves string
-            moves_str = ",".join(moves) if moves else None
-            
-            puzzle_data = {
-                "fen": fen,
-                "moves": moves_str,
-            }
+            puzzle_data = self.get_puzzle_data(tactic)
             puzzle_data_list.append(puzzle_data)
             
-            print(f"Puzzle {index}: FEN={fen}, Moves={moves_str}")
+            print(f"Puzzle {index}: FEN={puzzle_data['fen']}, Moves={puzzle_data['moves']}")
                 
         return puzzle_data_list
 
+    def get_puzzle_data(self, tactic: Tactic) -> dict:
+        """Puzzle dict of one tactic: its starting FEN and its comma-separated moves."""
+        moves = [position.move for position in tactic.positions if position.move]
+        return {
+            "fen": tactic.fen,
+            "moves": ",".join(moves) if moves else None,
+        }
+
     def preprocess_pgn_string(self, pgn_content: str) -> Optional[Tuple[list[str], Headers, str]]:
         """Extract moves and headers from PGN string."""
         try:
             pgn_io = io.StringIO(pgn_content)
-            game = chess.pgn.read_game(pgn_io)
+            record = read_game_record(pgn_io)
             
-            if game is None:
+            if record is None:
                 print("No game found in PGN content.")
                 return None
 
-            moves = [move.uci() for move in game.mainline_moves()]
-            headers = game.headers
-            starting_position = headers.get("FEN", "")
-            
-            return moves, headers, starting_position
+            return record.moves, record.headers, record.starting_position
         except Exception as e:
             print(f"Error preprocessing PGN: {e}")
             return None
@@ -177,4 +289,32 @@ class Analyzer:
             puzzle_data = self.extract_puzzle_data(variations_list, tactic_list)
             return puzzle_data
             
-        return None
\ No newline at end of file
+        return None
+
+    def stream(self, pgn_content: str) -> Iterator[dict]:
+        """
+        Analyze PGN content like `__call__`, yielding each puzzle dict as soon as its ply is analyzed.
+        A Stockfish error ends the stream; puzzles already yielded stand.
+        """
+        data = self.preprocess_pgn_string(pgn_content)
+
+        if data is None:
+            return
+
+        yield from self.stream_record(GameRecord(*data))
+
+    def stream_record(self, record: GameRecord) -> Iterator[dict]:
+        """Like `stream`, for a game the caller has already read."""
+        headers = record.headers
+        print(f"Finding tactics for game: {headers.get('White', '?')} vs {headers.get('Black', '?')}")
+
+        try:
+            for index, (variations, tactic) in enumerate(
+                self.iter_variations(moves=record.moves, starting_position=record.starting_position, headers=headers)
+            ):
+                self.archive_tactic(variations, tactic)
+                puzzle_data = self.get_puzzle_data(tactic)
+                print(f"Puzzle {index}: FEN={puzzle_data['fen']}, Moves={puzzle_data['moves']}")
+                yield puzzle_data
+        except ValueError as error:
+            print(f"Stockfish error: {error}")
\ No newline at end of file
@@ -0,0 +1,64 @@
+from typing import Optional
+
+from stockfish import Stockfish
+
+
+class MateSearchStockfish(Stockfish):
+    """
+    Stockfish client that can also bound a MultiPV search by a mate distance.
+
+    `go depth D mate N` stops as soon as the side to move has a mate in N, and otherwise
+    at depth D, which lets mating lines be resolved with much shallower searches than
+    the configured depth.
+    """
+
+    def get_top_moves_mate(self, num_top_moves: int, mate: int, depth: int) -> list[dict]:
+        old_multipv: int = self._parameters.multipv
+        if num_top_moves != old_multipv:
+            self._set_option("MultiPV", num_top_moves)
+
+        self._put(f"go depth {depth} mate {mate}")
+        lines: list[list[str]] = [
+            line.split(" ") for line in self._get_sf_go_command_output(self.get_top_moves_mate)
+        ]
+
+        if old_multipv != self._parameters.multipv:
+            self._set_option("MultiPV", old_multipv)
+
+        perspective: int = 1 if self.get_turn_perspective() or self._is_whites_turn() else -1
+        return parse_top_moves(lines, perspective)
+
+
+def parse_top_moves(lines: list[list[str]], perspective: int) -> list[dict]:
+    """
+    Lines of the last completed depth, best first.
+
+    Unlike `Stockfish.get_top_moves`, the last depth is read from the output, since a
+    mate-bounded search can stop before the depth it was given.
+    """
+    if lines and lines[-1][:2] == ["bestmove", "(none)"]:
+        return []
+
+    last_depth: Optional[str] = None
+    top_moves: dict[int, dict] = {}
+    for line in reversed(lines):
+        if "multipv" not in line or "depth" not in line or "pv" not in line:
+            continue
+        depth = pick(line, "depth")
+        if last_depth is None:
+            last_depth = depth
+        elif depth != last_depth:
+            break
+        multipv = int(pick(line, "multipv"))
+        if multipv in top_moves:
+            continue
+        top_moves[multipv] = {
+            "Move": pick(line, "pv"),
+            "Centipawn": int(pick(line, "cp")) * perspective if "cp" in line else None,
+            "Mate": int(pick(line, "mate")) * perspective if "mate" in line else None,
+        }
+    return [top_moves[multipv] for multipv in sorted(top_moves)]
+
+
+def pick(line: list[str], value: str) -> str:
+    return line[line.index(value) + 1]
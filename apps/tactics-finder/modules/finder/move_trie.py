@@ -0,0 +1,58 @@
+from dataclasses import dataclass, field, replace
+from typing import Iterator, Optional
+
+from chess.pgn import Headers
+
+from modules.finder.search_memo import SearchMemo
+from modules.structures.evaluation import Evaluation
+from modules.structures.tactic import Tactic
+from modules.structures.variations import Variations
+
+
+@dataclass
+class TrieNode:
+    """
+    One position reached by a move sequence, with everything its ply needs to be replayed.
+
+    A ply's tactic search depends on the history of the game (through the positions
+    earlier plies already visited), so results are keyed by the move sequence rather
+    than by FEN alone.
+    """
+    fen: Optional[str] = None
+    evaluation: Optional[Evaluation] = None
+    visited_fens: frozenset[str] = frozenset()
+    variations: Optional[Variations] = None
+    tactic: Optional[Tactic] = None
+    children: dict[str, "TrieNode"] = field(default_factory=dict)
+
+    def get_result(self, headers: Headers) -> Iterator[tuple[Variations, Tactic]]:
+        """The tactic found at this ply, labelled with the headers of the game asking for it."""
+        if self.variations is not None and self.tactic is not None:
+            yield replace(self.variations, headers=headers), replace(self.tactic, headers=headers)
+
+
+class MoveTrie:
+    """
+    Prefix trie of the games of one job.
+
+    Games of one user share long openings; the first game through a ply analyzes it
+    and every later game with the same move prefix reuses its evaluation and tactic.
+    The games also share one search memo, since engine lines only depend on the position.
+    """
+
+    def __init__(self):
+        self.roots: dict[tuple[str, int], TrieNode] = {}
+        self.memo = SearchMemo()
+        self.analyzed_plies = 0
+        self.reused_plies = 0
+        self.gated_plies = 0
+        self.screened_plies = 0
+
+    def get_root(self, starting_position: str, depth: int) -> TrieNode:
+        return self.roots.setdefault((starting_position, depth), TrieNode())
+
+    def __repr__(self):
+        return (
+            f"MoveTrie({self.analyzed_plies} plies analyzed, {self.reused_plies} reused, "
+            f"{self.gated_plies} already decided, {self.screened_plies} quiet, {self.memo})"
+        )
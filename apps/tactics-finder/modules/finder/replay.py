@@ -0,0 +1,157 @@
+import gzip
+import json
+from collections import defaultdict
+from typing import Any, Optional
+
+from modules.finder.mate_search import MateSearchStockfish
+
+REPLAY_VERSION = 1
+
+# (FEN last set or read back from the engine, moves played since) identifies a position
+# without asking the engine; the analysis is deterministic, so a replay reaches the
+# same keys in the same order as the recording
+PositionKey = tuple[str, tuple[str, ...]]
+
+
+class ReplayMissError(LookupError):
+    """The replayed analysis asked for something the recording never saw."""
+
+
+def get_query_key(position: PositionKey, depth: int, method: str, argument: Any = None) -> str:
+    fen, moves = position
+    return json.dumps([fen, list(moves), depth, method, argument])
+
+
+class EngineSession:
+    """Position and depth bookkeeping shared by the recording and the replaying engine."""
+
+    def __init__(self, depth: int):
+        self.depth = depth
+        self.position: PositionKey = ("startpos", ())
+
+    def set_depth(self, depth: int = 15) -> None:
+        self.depth = depth
+
+    def get_depth(self) -> int:
+        return self.depth
+
+    def set_fen_position(self, fen_position: str, do_validation: bool = True) -> None:
+        self.position = (" ".join(fen_position.split()), ())
+
+    def make_moves_from_current_position(self, moves: Optional[list[str]]) -> None:
+        if moves:
+            fen, played = self.position
+            self.position = (fen, played + tuple(moves))
+
+
+class RecordingEngine(EngineSession):
+    """
+    Stands in for Stockfish by forwarding every call to a real engine and recording
+    every answer, so the same analysis can be replayed later without the engine.
+    """
+
+    def __init__(self, stockfish: MateSearchStockfish):
+        super().__init__(stockfish.get_depth())
+        self.stockfish = stockfish
+        self.fens: dict[str, str] = {}
+        self.answers: dict[str, list[Any]] = defaultdict(list)
+
+    def set_depth(self, depth: int = 15) -> None:
+        super().set_depth(depth)
+        self.stockfish.set_depth(depth)
+
+    def send_ucinewgame_command(self) -> None:
+        self.stockfish.send_ucinewgame_command()
+
+    def set_fen_position(self, fen_position: str, do_validation: bool = True) -> None:
+        self.stockfish.set_fen_position(fen_position, do_validation)
+        super().set_fen_position(fen_position, do_validation)
+
+    def make_moves_from_current_position(self, moves: Optional[list[str]]) -> None:
+        self.stockfish.make_moves_from_current_position(moves)
+        super().make_moves_from_current_position(moves)
+
+    def get_fen_position(self) -> str:
+        fen = self.stockfish.get_fen_position()
+        self.fens[json.dumps([self.position[0], list(self.position[1])])] = fen
+        self.position = (fen, ())
+        return fen
+
+    def get_evaluation(self) -> dict:
+        evaluation = self.stockfish.get_evaluation()
+        self.answers[get_query_key(self.position, self.depth, "evaluation")].append(evaluation)
+        return evaluation
+
+    def get_top_moves(self, num_top_moves: int = 5) -> list[dict]:
+        top_moves = self.stockfish.get_top_moves(num_top_moves)
+        self.answers[get_query_key(self.position, self.depth, "top_moves", num_top_moves)].append(top_moves)
+        return top_moves
+
+    def get_top_moves_mate(self, num_top_moves: int, mate: int, depth: int) -> list[dict]:
+        top_moves = self.stockfish.get_top_moves_mate(num_top_moves, mate, depth)
+        key = get_query_key(self.position, depth, "top_moves_mate", [num_top_moves, mate])
+        self.answers[key].append(top_moves)
+        return top_moves
+
+    def save(self, path: str) -> None:
+        with gzip.open(path, "wt") as file:
+            json.dump({"version": REPLAY_VERSION, "fens": self.fens, "answers": self.answers}, file)
+
+    def __repr__(self):
+        return f"RecordingEngine({len(self.fens)} positions, {sum(map(len, self.answers.values()))} answers)"
+
+
+class ReplayEngine(EngineSession):
+    """
+    Answers the analyzer from a recording at memory speed, with no Stockfish binary.
+
+    A query asked more often than it was recorded gets its last recorded answer again;
+    a query that was never recorded raises ReplayMissError, because the Python side
+    then no longer takes the path the recording did.
+    """
+
+    def __init__(self, fens: dict[str, str], answers: dict[str, list[Any]], depth: int = 15):
+        super().__init__(depth)
+        self.fens = fens
+        self.answers = answers
+        self.replayed: dict[str, int] = defaultdict(int)
+        self.queries = 0
+
+    @staticmethod
+    def load(path: str) -> "ReplayEngine":
+        with gzip.open(path, "rt") as file:
+            recording = json.load(file)
+        if recording.get("version") != REPLAY_VERSION:
+            raise ValueError(f"unsupported replay version {recording.get('version')}")
+        return ReplayEngine(recording["fens"], recording["answers"])
+
+    def send_ucinewgame_command(self) -> None:
+        pass
+
+    def get_fen_position(self) -> str:
+        key = json.dumps([self.position[0], list(self.position[1])])
+        if key not in self.fens:
+            raise ReplayMissError(f"position {key} was not recorded")
+        self.position = (self.fens[key], ())
+        return self.position[0]
+
+    def replay(self, key: str) -> Any:
+        answers = self.answers.get(key)
+        if not answers:
+            raise ReplayMissError(f"query {key} was not recorded")
+        self.queries += 1
+        index = min(self.replayed[key], len(answers) - 1)
+        self.replayed[key] += 1
+        return answers[index]
+
+    def get_evaluation(self) -> dict:
+        return self.replay(get_query_key(self.position, self.depth, "evaluation"))
+
+    def get_top_moves(self, num_top_moves: int = 5) -> list[dict]:
+        return self.replay(get_query_key(self.position, self.depth, "top_moves", num_top_moves))
+
+    def get_top_moves_mate(self, num_top_moves: int, mate: int, depth: int) -> list[dict]:
+        return self.replay(get_query_key(self.position, depth, "top_moves_mate", [num_top_moves, mate]))
+
+    def __repr__(self):
+        return f"ReplayEngine({len(self.fens)} positions, {self.queries} queries replayed)"
@@ -0,0 +1,108 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import chess
+
+PIECE_VALUES = {chess.PAWN: 1, chess.KNIGHT: 3, chess.BISHOP: 3, chess.ROOK: 5, chess.QUEEN: 9, chess.KING: 100}
+
+
+@dataclass
+class PlyScreen:
+    """What the board alone tells about the position a ply leads to."""
+
+    legal_moves: int
+    in_check: bool
+    # The ply itself captured, so a recapture may be the only good move
+    capture: bool
+    # Legal captures and checks of the side to move
+    forcing_moves: int
+    # A piece of the side to move is attacked by a cheaper piece or not defended
+    threatened: bool
+
+    @property
+    def quiet(self) -> bool:
+        return not (self.in_check or self.capture or self.forcing_moves or self.threatened)
+
+
+def screen_plies(moves: list[str], starting_position: str = "") -> list[PlyScreen]:
+    """Screen the position after every ply of a game, in one pass over its moves."""
+    board = chess.Board(starting_position) if starting_position else chess.Board()
+    screens: list[PlyScreen] = []
+    for move in moves:
+        uci_move = chess.Move.from_uci(move)
+        capture = board.is_capture(uci_move)
+        board.push(uci_move)
+        screens.append(screen_board(board, capture))
+    return screens
+
+
+def screen_board(board: chess.Board, capture: bool = False) -> PlyScreen:
+    legal_moves = 0
+    forcing_moves = 0
+    for move in board.legal_moves:
+        legal_moves += 1
+        if board.is_capture(move) or board.gives_check(move):
+            forcing_moves += 1
+    return PlyScreen(
+        legal_moves=legal_moves,
+        in_check=board.is_check(),
+        capture=capture,
+        forcing_moves=forcing_moves,
+        threatened=is_threatened(board, board.turn),
+    )
+
+
+def is_threatened(board: chess.Board, color: chess.Color) -> bool:
+    for square in chess.scan_forward(board.occupied_co[color] & ~board.kings):
+        attackers = board.attackers(not color, square)
+        if not attackers:
+            continue
+        if not board.is_attacked_by(color, square):
+            return True
+        value = PIECE_VALUES[get_piece_type(board, square)]
+        if any(PIECE_VALUES[get_piece_type(board, attacker)] < value for attacker in attackers):
+            return True
+    return False
+
+
+def get_piece_type(board: chess.Board, square: chess.Square) -> chess.PieceType:
+    """Type of the piece on an occupied square."""
+    piece_type = board.piece_type_at(square)
+    assert piece_type is not None, "square is empty"
+    return piece_type
+
+
+def get_only_move(board: chess.Board) -> Optional[chess.Move]:
+    """The single legal move of the position, if it has exactly one."""
+    moves = iter(board.legal_moves)
+    only_move = next(moves, None)
+    if only_move is None or next(moves, None) is not None:
+        return None
+    return only_move
+
+
+def get_forced_line(move: str, child_lines: list[dict], child_board: chess.Board, turn_perspective: bool) -> dict:
+    """
+    The engine line of a position with a single legal move, made from the best line of
+    the position after it. Scores are for the side to move, or for white unless
+    `turn_perspective`, and a mate takes one move longer for the side that is mated.
+    """
+    child_sign = 1 if turn_perspective or child_board.turn == chess.WHITE else -1
+    parent_sign = 1 if turn_perspective or child_board.turn == chess.BLACK else -1
+    if child_board.is_checkmate():
+        return {"Move": move, "Centipawn": None, "Mate": parent_sign}
+    if not child_lines:
+        return {"Move": move, "Centipawn": 0, "Mate": None}
+
+    best_line = child_lines[0]
+    if best_line["Mate"] is not None:
+        mate = best_line["Mate"] * child_sign
+        mate = -mate if mate > 0 else -mate + 1
+        return {"Move": move, "Centipawn": None, "Mate": mate * parent_sign}
+    return {"Move": move, "Centipawn": -best_line["Centipawn"] * child_sign * parent_sign, "Mate": None}
+
+
+def is_turn_perspective(stockfish) -> bool:
+    """Whether the engine scores for the side to move; stand-in engines forward one that does."""
+    get_turn_perspective = getattr(stockfish, "get_turn_perspective", None)
+    return get_turn_perspective() if get_turn_perspective is not None else True
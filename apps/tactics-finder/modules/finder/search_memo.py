@@ -0,0 +1,53 @@
+from typing import Optional
+
+from modules.structures.evaluation import Evaluation
+
+
+class SearchMemo:
+    """
+    Engine lines already computed for one game, keyed by FEN, search role and mate bound.
+
+    The role matters because attacker and defender nodes ask for a different number
+    of lines; the lines themselves only depend on the position. A search bounded by
+    the attacker's known mate stops short of the configured depth, so its lines only
+    answer the same bound, while unbounded lines answer any. Sharing one memo across
+    the plies of a game lets a later ply reuse every node an earlier tree already
+    searched.
+    """
+
+    def __init__(self):
+        self.lines: dict[tuple[str, bool, Optional[int]], list[dict]] = {}
+        # Positions and roles whose unbounded lines the engine searched, rather than
+        # lines made up from the position after a forced move
+        self.searched: set[tuple[str, bool]] = set()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, fen: str, defender: bool, mate: Optional[int] = None) -> Optional[list[dict]]:
+        best_moves = self.lines.get((fen, defender, mate))
+        if best_moves is None and mate is not None:
+            best_moves = self.lines.get((fen, defender, None))
+        if best_moves is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return best_moves
+
+    def store(
+        self, fen: str, defender: bool, best_moves: list[dict], mate: Optional[int] = None, searched: bool = True
+    ) -> None:
+        self.lines[(fen, defender, mate)] = best_moves
+        if searched and mate is None:
+            self.searched.add((fen, defender))
+
+    def get_evaluation(self, fen: str) -> Optional[Evaluation]:
+        """Evaluation of the best line of a full-depth, unbounded engine search of this position in either role."""
+        for defender in (False, True):
+            best_moves = self.lines.get((fen, defender, None)) if (fen, defender) in self.searched else None
+            if best_moves:
+                self.hits += 1
+                return Evaluation.from_stockfish(best_moves[0])
+        return None
+
+    def __repr__(self):
+        return f"SearchMemo({len(self.lines)} positions, {self.hits} hits, {self.misses} misses)"
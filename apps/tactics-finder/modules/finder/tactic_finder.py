@@ -1,3 +1,4 @@
+import itertools
 from typing import Optional, Tuple
 
 import chess
@@ -7,11 +8,14 @@ from stockfish import Stockfish
 
 from modules.configuration import load_configuration
 from modules.finder.auxiliary import calculate_material_balance
+from modules.finder.screening import PlyScreen, get_forced_line, get_only_move, is_turn_perspective
+from modules.finder.search_memo import SearchMemo
 from modules.structures.evaluation import Evaluation
 from modules.structures.outcome import Outcome
 from modules.structures.position import Position, PositionOccurred
 from modules.structures.tactic import Tactic
 from modules.structures.variations import Variations, get_node_history
+from modules.tracing import annotate, get_search_nodes, get_tracer, traced
 
 configuration = load_configuration()
 
@@ -24,6 +28,16 @@ REPETITION_THRESHOLD = configuration["algorithm"]["repetition_threshold"]
 MIN_RELATIVE_MATERIAL_BALANCE = configuration["algorithm"]["min_relative_material_balance"]
 
 STOCKFISH_TOP_MOVES = configuration["stockfish"]["top_moves"]
+ADAPTIVE_MULTIPV = configuration["stockfish"]["adaptive_multipv"]
+MATE_SEARCH = configuration["stockfish"]["mate_search"]
+MATE_SEARCH_DEPTH_MARGIN = configuration["stockfish"]["mate_search_depth_margin"]
+GATE_DECIDED_PLIES = configuration["stockfish"]["gate_decided_plies"]
+GATE_MARGIN_CENTIPAWNS = configuration["stockfish"]["gate_margin_centipawns"]
+SCREEN_FORCED_NODES = configuration["stockfish"]["screen_forced_nodes"]
+SCREEN_QUIET_PLIES = configuration["stockfish"]["screen_quiet_plies"]
+
+# is_position_hard and is_only_one_good_move never look past the second line
+DECISION_TOP_MOVES = 2
 
 
 class TacticFinder:
@@ -37,11 +51,21 @@ class TacticFinder:
         centipawn_tolerance: float = CENTIPAWN_TOLERANCE,
         checkmate_progress_threshold: float = CHECKMATE_PROGRESS_THRESHOLD,
         repetition_threshold: int = REPETITION_THRESHOLD,
+        min_relative_material_balance: int = MIN_RELATIVE_MATERIAL_BALANCE,
         stockfish_top_moves: int = STOCKFISH_TOP_MOVES,
+        adaptive_multipv: bool = ADAPTIVE_MULTIPV,
+        mate_search: bool = MATE_SEARCH,
+        mate_search_depth_margin: int = MATE_SEARCH_DEPTH_MARGIN,
+        gate_decided_plies: bool = GATE_DECIDED_PLIES,
+        gate_margin_centipawns: float = GATE_MARGIN_CENTIPAWNS,
+        screen_forced_nodes: bool = SCREEN_FORCED_NODES,
+        screen_quiet_plies: bool = SCREEN_QUIET_PLIES,
         fens: Optional[set[str]] = None,
+        memo: Optional[SearchMemo] = None,
     ):
         self.stockfish: Stockfish = stockfish
         self.fens: set[str] = set() if fens is None else fens
+        self.memo: SearchMemo = SearchMemo() if memo is None else memo
         self.white: bool = white
         self.visited_fens: set[str] = set()
 
@@ -55,7 +79,132 @@ class TacticFinder:
         self.pawn_tolerance: float = centipawn_tolerance / 100
         self.checkmate_progress_threshold: float = checkmate_progress_threshold
         self.repetition_threshold: int = repetition_threshold
+        self.min_relative_material_balance: int = min_relative_material_balance
         self.stockfish_top_moves: int = stockfish_top_moves
+        self.adaptive_multipv: bool = adaptive_multipv
+        self.mate_search: bool = mate_search
+        self.mate_search_depth_margin: int = mate_search_depth_margin
+        self.gate_decided_plies: bool = gate_decided_plies
+        self.gate_margin: float = gate_margin_centipawns / 100
+        self.screen_forced_nodes: bool = screen_forced_nodes
+        self.screen_quiet_plies: bool = screen_quiet_plies
+
+    def is_decided(self, evaluation: Evaluation, board: chess.Board) -> bool:
+        """
+        Whether the mainline evaluation of the starting position already rules out a tactic.
+
+        A tactic starts with `is_only_one_good_move` at the root, which turns down a best
+        line outside [0, pawn_limit] unless it mates, it is the only legal move or the
+        second line is a mate. Mate scores and single legal moves are always searched.
+
+        The gate is not conservative, so it is off unless `gate_decided_plies` is set: a
+        position won beyond the limit whose second line is a mate against the mover is
+        given up, and so is any root whose MultiPV search lands more than the margin away
+        from the mainline evaluation. `analyze.py --compare-gating` measures what it drops.
+        """
+        if not self.gate_decided_plies or evaluation.mate:
+            return False
+        if len(list(itertools.islice(board.legal_moves, 2))) < 2:
+            return False
+        value: float = evaluation.value if self.white else -evaluation.value
+        return value < -self.gate_margin or value > self.pawn_limit + self.gate_margin
+
+    def is_quiet(self, evaluation: Evaluation, screen: PlyScreen) -> bool:
+        """
+        Whether the starting position is too quiet to start a tactic: no check, no
+        capture to answer, no capture or check to play and nothing en prise. This only
+        makes a tactic unlikely, so it is off unless `screen_quiet_plies` is set.
+        """
+        return self.screen_quiet_plies and not evaluation.mate and screen.quiet
+
+    def get_node_top_moves(self, fen: str, defender: bool, mate: Optional[int] = None) -> list[dict]:
+        mate = self.get_mate_bound(mate)
+        best_moves: Optional[list[dict]] = self.memo.get(fen, defender, mate)
+        if best_moves is None:
+            only_move = get_only_move(chess.Board(fen)) if self.screen_forced_nodes and defender else None
+            if only_move is not None:
+                best_moves = self.get_forced_top_moves(fen, only_move, defender, mate)
+            else:
+                best_moves = self.search_node_top_moves(defender, mate)
+            self.memo.store(fen, defender, best_moves, mate, searched=only_move is None)
+        return best_moves
+
+    def get_mate_bound(self, mate: Optional[int]) -> Optional[int]:
+        """The attacker's known mate if it makes the search shallower than the configured depth."""
+        if not self.mate_search or mate is None:
+            return None
+        if 2 * mate + self.mate_search_depth_margin >= self.stockfish.get_depth():
+            return None
+        return mate
+
+    def get_forced_top_moves(
+        self, fen: str, only_move: chess.Move, defender: bool, mate: Optional[int] = None
+    ) -> list[dict]:
+        """
+        Line of a position with a single legal move, without searching it: it is read
+        from the lines of the position after the move, which the node's only child
+        needs anyway and finds in the memo. The attacker's known mate bounds that
+        search as it would have bounded this one.
+        """
+        with get_tracer().span("forced node", "screening"):
+            child_board: chess.Board = chess.Board(fen)
+            child_board.push(only_move)
+            child_lines: list[dict] = []
+            if not child_board.is_checkmate() and not child_board.is_stalemate():
+                self.stockfish.make_moves_from_current_position([only_move.uci()])
+                child_fen: str = self.stockfish.get_fen_position()
+                child_lines = self.get_node_top_moves(child_fen, not defender, mate)
+                self.stockfish.set_fen_position(fen)
+            return [get_forced_line(only_move.uci(), child_lines, child_board, is_turn_perspective(self.stockfish))]
+
+    def search_node_top_moves(self, defender: bool, mate: Optional[int] = None) -> list[dict]:
+        """
+        Ask the engine for as few lines as the node's decision needs.
+
+        Attacker nodes only compare the two best moves. Defender nodes need every move
+        within tolerance of the best one, so they are widened to the full MultiPV only
+        when the last of the first two lines is still good enough.
+        """
+        if not self.adaptive_multipv or self.stockfish_top_moves <= DECISION_TOP_MOVES:
+            return self.get_top_moves(self.stockfish_top_moves, mate)
+
+        best_moves: list[dict] = self.get_top_moves(DECISION_TOP_MOVES, mate)
+        if defender and len(best_moves) == DECISION_TOP_MOVES:
+            if best_moves[-1]["Move"] in self.get_good_enough_moves(best_moves):
+                best_moves = self.get_top_moves(self.stockfish_top_moves, mate)
+        return best_moves
+
+    def get_top_moves(self, num_top_moves: int, mate: Optional[int] = None) -> list[dict]:
+        """
+        Top moves at the configured depth, or bounded by the attacker's known mate.
+
+        Inside a mating net the attacker's mate in `mate` is already known, so the search
+        only needs to be deep enough to see it again: it stops as soon as the attacker
+        finds the mate, and defender nodes search just past the mate's length.
+        """
+        tracer = get_tracer()
+        depth: int = self.stockfish.get_depth()
+        method: str = "get_top_moves"
+        mate = self.get_mate_bound(mate)
+        if mate is not None:
+            depth = 2 * mate + self.mate_search_depth_margin
+            method = "get_top_moves_mate"
+
+        with tracer.span("engine top moves", "engine", lines=num_top_moves, depth=depth, mate=mate) as span:
+            if mate is not None:
+                best_moves: list[dict] = self.stockfish.get_top_moves_mate(num_top_moves, mate, depth)
+            else:
+                best_moves = self.stockfish.get_top_moves(num_top_moves)
+            if tracer.enabled:
+                span["nodes"] = get_search_nodes(self.stockfish, method)
+        return best_moves
+
+    def get_attacker_mate(self, evaluation: Optional[Evaluation]) -> Optional[int]:
+        """Number of moves in which the attacker mates according to `evaluation`, if it does."""
+        if evaluation is None or not evaluation.mate:
+            return None
+        value: int = evaluation.value if self.white else -evaluation.value
+        return value if value > 0 else None
 
     def get_evaluations_from_best_moves(self, best_moves: Optional[list[dict]] = None) -> list[Evaluation]:
         if best_moves is None:
@@ -173,19 +322,22 @@ class TacticFinder:
 
         return root
 
+    @traced("node", "search")
     def find(
         self,
         move: Optional[str] = None,
         previous_fen: str = "",
         defender: bool = False,
         parent: Optional[Node] = None,
+        mate: Optional[int] = None,
     ) -> Node:
         fen: str = self.stockfish.get_fen_position()
+        annotate(fen=fen, move=move, defender=defender)
         self.visited_fens.add(fen)
         if fen in self.fens:
             raise PositionOccurred("position already occurred")
 
-        best_moves: list[dict] = self.stockfish.get_top_moves(self.stockfish_top_moves)
+        best_moves: list[dict] = self.get_node_top_moves(fen, defender, mate)
         material_balance: int = self.get_relative_material_balance(fen)
         color: bool = self.white ^ defender
         forced: bool = len(best_moves) == 1 and self.stockfish_top_moves > 1
@@ -229,16 +381,20 @@ class TacticFinder:
             if defender:
                 good_enough_responses: list[str] = self.get_good_enough_moves(best_moves)
                 new_fen: str = self.stockfish.get_fen_position()
+                # A forced node's only reply was searched under this node's bound, which is kept so
+                # the memo answers it; the bound read back from the forced line can be shorter
+                forced_node: bool = self.screen_forced_nodes and get_only_move(board) is not None
+                child_mate: Optional[int] = mate if forced_node else self.get_attacker_mate(evaluation)
                 for response in good_enough_responses:
                     self.stockfish.set_fen_position(new_fen)
                     self.stockfish.make_moves_from_current_position([response])
-                    self.find(response, fen, False, parent=node)
+                    self.find(response, fen, False, parent=node, mate=child_mate)
 
             else:
                 if self.is_only_one_good_move(best_moves):
                     best_move: str = best_moves[0]["Move"]
                     self.stockfish.make_moves_from_current_position([best_move])
-                    self.find(best_move, fen, True, parent=node)
+                    self.find(best_move, fen, True, parent=node, mate=self.get_attacker_mate(evaluation))
 
             self.stockfish.set_fen_position(fen)
 
@@ -265,7 +421,7 @@ class TacticFinder:
                 if abs(evaluation.value) - 1 < self.checkmate_counter * self.checkmate_progress_threshold:
                     return Outcome("checkmate", "mating net")
 
-        material_advantage = material_balance >= MIN_RELATIVE_MATERIAL_BALANCE
+        material_advantage = material_balance >= self.min_relative_material_balance
         if material_advantage:
             return Outcome("material advantage", "material advantage")
 
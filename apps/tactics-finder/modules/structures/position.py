@@ -1,10 +1,19 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, cast
 
+from modules.binary import BinaryReader, BinaryWriter
 from modules.structures.evaluation import Evaluation
 from modules.structures.outcome import Outcome
 
 
+COLOR_FLAG = 1
+FORCED_FLAG = 2
+HARD_FLAG = 4
+OUTCOME_FLAG = 8
+MATE_EVALUATION_FLAG = 16
+FLOAT_EVALUATION_FLAG = 32
+
+
 @dataclass
 class Position:
     move: str
@@ -39,6 +48,53 @@ class Position:
                 dictionary[key] = Outcome(**value)
         return Position(**dictionary)
 
+    def to_binary(self, writer: BinaryWriter) -> None:
+        flags = (
+            COLOR_FLAG * self.color
+            | FORCED_FLAG * self.forced
+            | HARD_FLAG * self.hard
+            | OUTCOME_FLAG * (self.outcome is not None)
+        )
+        if self.evaluation is not None:
+            flags |= MATE_EVALUATION_FLAG if self.evaluation.mate else FLOAT_EVALUATION_FLAG
+        writer.write_byte(flags)
+        writer.write_string(self.move)
+        writer.write_string(self.fen)
+        writer.write_signed(self.material_balance)
+        if flags & MATE_EVALUATION_FLAG:
+            writer.write_signed(self.evaluation.value)
+        elif flags & FLOAT_EVALUATION_FLAG:
+            writer.write_float(self.evaluation.value)
+        if self.outcome is not None:
+            writer.write_string(self.outcome.type)
+            writer.write_string(self.outcome.description)
+
+    @staticmethod
+    def from_binary(reader: BinaryReader) -> "Position":
+        flags = reader.read_byte()
+        move = reader.read_string()
+        fen = reader.read_string()
+        material_balance = reader.read_signed()
+        evaluation: Optional[Evaluation] = None
+        if flags & MATE_EVALUATION_FLAG:
+            evaluation = Evaluation(reader.read_signed())
+        elif flags & FLOAT_EVALUATION_FLAG:
+            evaluation = Evaluation(reader.read_float())
+        outcome = None
+        if flags & OUTCOME_FLAG:
+            outcome = Outcome(reader.read_string(), reader.read_string())
+        return Position(
+            move=move,
+            color=bool(flags & COLOR_FLAG),
+            # Kept as None when missing, as from_json does
+            evaluation=cast(Evaluation, evaluation),
+            fen=fen,
+            forced=bool(flags & FORCED_FLAG),
+            hard=bool(flags & HARD_FLAG),
+            material_balance=material_balance,
+            outcome=outcome,
+        )
+
 
 class PositionOccurred(BaseException):
     pass
\ No newline at end of file
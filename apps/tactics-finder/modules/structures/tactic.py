@@ -3,6 +3,7 @@ from typing import Optional
 import chess
 import chess.pgn
 from chess.pgn import Headers
+from modules.binary import BinaryReader, BinaryWriter
 from modules.converter import create_game_from_board
 from modules.picklable import Picklable
 from modules.structures.evaluation import Evaluation
@@ -67,6 +68,23 @@ class Tactic(Picklable):
             return create_game_from_board(Headers(), board)
         return create_game_from_board(self.headers, board)
 
+    def to_binary(self, writer: Optional[BinaryWriter] = None) -> bytes:
+        writer = BinaryWriter() if writer is None else writer
+        writer.write_string(self.type)
+        writer.write_headers(self.headers)
+        writer.write_varint(len(self.positions))
+        for position in self.positions:
+            position.to_binary(writer)
+        return writer.getvalue()
+
+    @staticmethod
+    def from_binary(data: bytes) -> "Tactic":
+        reader = BinaryReader(data)
+        tactic_type = reader.read_string()
+        headers = reader.read_headers()
+        positions = [Position.from_binary(reader) for _ in range(reader.read_varint())]
+        return Tactic(positions, headers=headers, type=tactic_type)
+
     @property
     def fen(self) -> str:
         return self.positions[0].fen
@@ -9,6 +9,7 @@ from anytree.importer import JsonImporter
 
 from chess.pgn import Headers
 
+from modules.binary import BinaryReader, BinaryWriter
 from modules.header import get_headers
 from modules.picklable import Picklable
 from modules.structures.position import Position
@@ -72,4 +73,29 @@ class Variations(Picklable):
             if isinstance(node.name, dict):
                 node.name = Position.from_json(node.name)
         headers = get_headers(dictionary["headers"])
+        return Variations(root=root, headers=headers)
+
+    def to_binary(self) -> bytes:
+        """Encode the tree in pre-order, each position followed by its number of children."""
+        writer = BinaryWriter()
+        writer.write_headers(self.headers)
+        for node in PreOrderIter(self.root):
+            node.name.to_binary(writer)
+            writer.write_varint(len(node.children))
+        return writer.getvalue()
+
+    @staticmethod
+    def from_binary(data: bytes) -> "Variations":
+        reader = BinaryReader(data)
+        headers = reader.read_headers()
+        root: Node = Node(Position.from_binary(reader))
+        # Parents still waiting for children, with how many they are owed
+        pending: list[list] = [[root, reader.read_varint()]]
+        while pending:
+            if pending[-1][1] == 0:
+                pending.pop()
+                continue
+            pending[-1][1] -= 1
+            node = Node(Position.from_binary(reader), parent=pending[-1][0])
+            pending.append([node, reader.read_varint()])
         return Variations(root=root, headers=headers)
\ No newline at end of file
@@ -0,0 +1,105 @@
+import math
+import threading
+import time
+from dataclasses import dataclass
+
+import redis
+
+
+def get_processing_queue(queue: str, node_id: str) -> str:
+    return f"{queue}_processing:{node_id}"
+
+
+@dataclass
+class NodeStatus:
+    capacity: int
+    load: int
+
+
+class LoadCounter:
+    """Jobs in flight on this node; pool callbacks update it from the result handler thread."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0
+
+    def increment(self) -> None:
+        with self.lock:
+            self.value += 1
+
+    def decrement(self) -> None:
+        with self.lock:
+            self.value -= 1
+
+
+class NodeRegistry:
+    """
+    Registers this worker node in Redis so several nodes can share one queue.
+
+    Every node heartbeats its capacity (the most jobs it runs, and so claims, at once)
+    and its current load under a key that expires when it stops. Each node keeps its
+    claimed jobs in its own processing list, so a node that disappears can have exactly
+    its jobs put back on the main queue.
+    """
+
+    def __init__(self, client: redis.Redis, queue: str, node_id: str, heartbeat_ttl: int = 30):
+        self.client = client
+        self.queue = queue
+        self.node_id = node_id
+        self.heartbeat_ttl = heartbeat_ttl
+        self.nodes_key = f"{queue}:nodes"
+        self.processing_queue = get_processing_queue(queue, node_id)
+        self.nodes: dict[str, NodeStatus] = {}
+
+    def get_node_key(self, node_id: str) -> str:
+        return f"{self.queue}:node:{node_id}"
+
+    def heartbeat(self, capacity: int, load: int) -> None:
+        node_key = self.get_node_key(self.node_id)
+        pipeline = self.client.pipeline()
+        pipeline.sadd(self.nodes_key, self.node_id)
+        pipeline.hset(node_key, mapping={"capacity": capacity, "load": load, "updated": time.time()})
+        pipeline.expire(node_key, self.heartbeat_ttl)
+        pipeline.execute()
+        self.nodes = self.get_nodes()
+        self.nodes[self.node_id] = NodeStatus(capacity, load)
+
+    def get_nodes(self) -> dict[str, NodeStatus]:
+        """Live nodes; nodes whose heartbeat expired have their jobs requeued and are dropped."""
+        nodes: dict[str, NodeStatus] = {}
+        for raw_node_id in self.client.smembers(self.nodes_key):
+            node_id = raw_node_id.decode("utf-8") if isinstance(raw_node_id, bytes) else raw_node_id
+            status = self.client.hgetall(self.get_node_key(node_id))
+            if not status:
+                requeued = self.requeue(get_processing_queue(self.queue, node_id))
+                self.client.srem(self.nodes_key, node_id)
+                print(f"♻ Node {node_id} stopped heartbeating, requeued {requeued} job(s)")
+                continue
+            nodes[node_id] = NodeStatus(int(status[b"capacity"]), int(status[b"load"]))
+        return nodes
+
+    def requeue(self, processing_queue: str) -> int:
+        """Move every job of a processing list to the consuming end of the main queue, oldest first."""
+        requeued = 0
+        while self.client.lmove(processing_queue, self.queue, "LEFT", "RIGHT") is not None:
+            requeued += 1
+        return requeued
+
+    def get_share(self, waiting: int, capacity: int, load: int) -> int:
+        """Jobs this node should plan for: its own load plus its capacity-weighted part of the backlog."""
+        total_capacity = self.get_total_capacity(capacity)
+        if total_capacity == 0:
+            return load + waiting
+        return load + math.ceil(waiting * capacity / total_capacity)
+
+    def get_backlog(self, waiting: int, capacity: int) -> float:
+        """Jobs waiting per engine across every registered node."""
+        return waiting / max(1, self.get_total_capacity(capacity))
+
+    def get_total_capacity(self, capacity: int) -> int:
+        others = sum(status.capacity for node_id, status in self.nodes.items() if node_id != self.node_id)
+        return others + capacity
+
+    def deregister(self) -> None:
+        self.client.delete(self.get_node_key(self.node_id))
+        self.client.srem(self.nodes_key, self.node_id)
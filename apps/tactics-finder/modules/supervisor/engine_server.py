@@ -0,0 +1,260 @@
+import itertools
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from dataclasses import dataclass, field
+from multiprocessing import Process
+from typing import Any, Optional
+
+import chess
+
+from modules.finder.replay import EngineSession
+
+# Environment variable through which pool workers find the engine server
+ENGINE_SOCKET_VARIABLE = "ENGINE_SOCKET"
+
+STARTING_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+# Client methods of the requests, under which their raw output is kept for tracing
+ENGINE_METHODS = {
+    "evaluation": "get_evaluation",
+    "top_moves": "get_top_moves",
+    "top_moves_mate": "get_top_moves_mate",
+}
+
+
+class EngineServerError(RuntimeError):
+    pass
+
+
+@dataclass(order=True)
+class EngineRequest:
+    priority: float
+    sequence: int
+    body: dict = field(compare=False)
+    reply: queue.Queue = field(compare=False, default_factory=lambda: queue.Queue(1))
+
+
+class EngineScheduler:
+    """
+    Runs requests from every worker on a fixed set of engines, oldest job first.
+
+    Requests carry the whole position, so any idle engine can take the next one and
+    no engine waits while a worker does its Python-side bookkeeping. An engine that
+    cannot be started leaves the requests to the others; once none is left, every
+    request is answered with an error instead of waiting forever.
+    """
+
+    def __init__(self, engines: int, report_interval: float = 300.0):
+        self.engine_count = engines
+        self.live_engines = engines
+        self.report_interval = report_interval
+        self.requests: queue.PriorityQueue[EngineRequest] = queue.PriorityQueue()
+        self.sequence = itertools.count()
+        self.busy_seconds = [0.0] * engines
+        self.lock = threading.Lock()
+
+    def submit(self, body: dict) -> Any:
+        request = EngineRequest(float(body.get("priority", 0.0)), next(self.sequence), body)
+        self.requests.put(request)
+        return request.reply.get()
+
+    def start(self) -> None:
+        for index in range(self.engine_count):
+            threading.Thread(target=self.run_engine, args=(index,), name=f"engine-{index}", daemon=True).start()
+        threading.Thread(target=self.report, name="engine-report", daemon=True).start()
+
+    def run_engine(self, index: int) -> None:
+        stockfish = self.start_engine(index)
+        while stockfish is not None:
+            request = self.requests.get()
+            started = time.monotonic()
+            try:
+                result, nodes_line = self.execute(stockfish, request.body)
+                reply = {"result": result, "nodes_line": nodes_line}
+            except ValueError as e:
+                reply = {"error": str(e), "type": "ValueError"}
+            except Exception as e:
+                reply = {"error": str(e), "type": type(e).__name__}
+                print(f"[Engine Server] Engine {index} failed, restarting it: {e}")
+                self.quit_engine(stockfish)
+                stockfish = self.start_engine(index)
+            with self.lock:
+                self.busy_seconds[index] += time.monotonic() - started
+            request.reply.put(reply)
+
+        with self.lock:
+            self.live_engines -= 1
+            last_engine = self.live_engines == 0
+        if last_engine:
+            self.fail_requests()
+
+    @staticmethod
+    def start_engine(index: int) -> Any:
+        """A new engine for thread `index`, or None when it cannot be started."""
+        from modules.finder.analyzer import create_stockfish
+
+        try:
+            return create_stockfish()
+        except Exception as e:
+            print(f"[Engine Server] Engine {index} could not be started: {e}")
+            return None
+
+    @staticmethod
+    def quit_engine(stockfish) -> None:
+        """Stop a failed engine before it is replaced, so dead engines do not pile up."""
+        from modules.finder.analyzer import quit_stockfish
+
+        quit_stockfish(stockfish)
+
+    def fail_requests(self) -> None:
+        print("[Engine Server] No engine is left, failing every request")
+        while True:
+            request = self.requests.get()
+            request.reply.put({"error": "no engine is running", "type": "EngineServerError"})
+
+    @staticmethod
+    def execute(stockfish, body: dict) -> tuple[Any, Optional[str]]:
+        """The answer to a request, with the last line of engine output that counts its nodes."""
+        fen = body["fen"] if body["fen"] != "startpos" else STARTING_FEN
+        stockfish.set_fen_position(fen)
+        if body["moves"]:
+            stockfish.make_moves_from_current_position(body["moves"])
+        if stockfish.get_depth() != body["depth"]:
+            stockfish.set_depth(body["depth"])
+
+        method = ENGINE_METHODS.get(body["method"])
+        if method is None:
+            raise EngineServerError(f"unknown method {body['method']}")
+        result = getattr(stockfish, method)(*body["args"])
+        output = getattr(stockfish, "_raw_stockfish_output", {}).get(method) or []
+        nodes_line = next((line for line in reversed(output) if " nodes " in line), None)
+        return result, nodes_line
+
+    def report(self) -> None:
+        while True:
+            with self.lock:
+                before = sum(self.busy_seconds)
+            time.sleep(self.report_interval)
+            with self.lock:
+                busy = sum(self.busy_seconds) - before
+            utilization = min(1.0, busy / (self.report_interval * self.engine_count))
+            print(
+                f"[Engine Server] {self.engine_count} engines {utilization:.0%} busy, "
+                f"{self.requests.qsize()} request(s) waiting"
+            )
+
+
+class EngineRequestHandler(socketserver.StreamRequestHandler):
+    server: "EngineServer"
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            reply = self.server.scheduler.submit(json.loads(line))
+            self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class EngineServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, scheduler: EngineScheduler):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        super().__init__(socket_path, EngineRequestHandler)
+        self.scheduler = scheduler
+
+
+def serve_engines(socket_path: str, engines: int, report_interval: float) -> None:
+    scheduler = EngineScheduler(engines, report_interval)
+    scheduler.start()
+    with EngineServer(socket_path, scheduler) as server:
+        server.serve_forever()
+
+
+def start_engine_server(socket_path: str, engines: int, report_interval: float, timeout: float) -> Process:
+    """Run the engine server in its own process and wait until it accepts connections."""
+    process = Process(target=serve_engines, args=(socket_path, engines, report_interval), daemon=True)
+    process.start()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                probe.connect(socket_path)
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise EngineServerError(f"engine server did not start within {timeout}s")
+
+
+class RemoteEngine(EngineSession):
+    """
+    Stands in for Stockfish in a worker by sending each search to the engine server.
+
+    The position is tracked locally and sent with every request, and FENs are worked
+    out locally with python-chess. `priority` orders this worker's requests against
+    the others; lower goes first, and the worker sets it to the time its current job
+    started so older jobs are finished first.
+    """
+
+    def __init__(self, socket_path: str, depth: int = 15):
+        super().__init__(depth)
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(socket_path)
+        self.file = self.socket.makefile("rwb")
+        self.priority = 0.0
+        # Last line with a node count per method, read by tracing as from the Stockfish client
+        self._raw_stockfish_output: dict[str, list[str]] = {}
+
+    def request(self, method: str, *args) -> Any:
+        fen, moves = self.position
+        body = {
+            "priority": self.priority,
+            "fen": fen,
+            "moves": list(moves),
+            "depth": self.depth,
+            "method": method,
+            "args": list(args),
+        }
+        self.file.write(json.dumps(body).encode("utf-8") + b"\n")
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise EngineServerError("engine server closed the connection")
+        reply = json.loads(line)
+        if "error" in reply:
+            if reply["type"] == "ValueError":
+                raise ValueError(reply["error"])
+            raise EngineServerError(reply["error"])
+        self._raw_stockfish_output[ENGINE_METHODS[method]] = [reply["nodes_line"]] if reply["nodes_line"] else []
+        return reply["result"]
+
+    def close(self) -> None:
+        self.file.close()
+        self.socket.close()
+
+    def send_ucinewgame_command(self) -> None:
+        # Engines are shared with other workers, which are in the middle of their own games
+        pass
+
+    def get_fen_position(self) -> str:
+        fen, moves = self.position
+        board = chess.Board(fen if fen != "startpos" else STARTING_FEN)
+        for move in moves:
+            board.push_uci(move)
+        self.position = (board.fen(), ())
+        return self.position[0]
+
+    def get_evaluation(self) -> dict:
+        return self.request("evaluation")
+
+    def get_top_moves(self, num_top_moves: int = 5) -> list[dict]:
+        return self.request("top_moves", num_top_moves)
+
+    def get_top_moves_mate(self, num_top_moves: int, mate: int, depth: int) -> list[dict]:
+        return self.request("top_moves_mate", num_top_moves, mate, depth)
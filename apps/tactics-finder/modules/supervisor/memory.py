@@ -0,0 +1,154 @@
+import glob
+import multiprocessing
+from typing import Optional, Dict, Any
+
+CGROUP_V2_MEMORY_MAX = "/sys/fs/cgroup/memory.max"
+CGROUP_V1_MEMORY_LIMIT = "/sys/fs/cgroup/memory/memory.limit_in_bytes"
+MEMINFO_PATH = "/proc/meminfo"
+
+MB = 1024 * 1024
+
+
+def read_total_memory() -> Optional[int]:
+    try:
+        with open(MEMINFO_PATH, "r") as file:
+            for line in file:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def read_memory_limit() -> Optional[int]:
+    """Memory available to this container in bytes: the cgroup limit if set, the host total otherwise."""
+    total = read_total_memory()
+    limit: Optional[int] = None
+    try:
+        with open(CGROUP_V2_MEMORY_MAX, "r") as file:
+            value = file.read().strip()
+        limit = None if value == "max" else int(value)
+    except (OSError, ValueError):
+        try:
+            with open(CGROUP_V1_MEMORY_LIMIT, "r") as file:
+                limit = int(file.read())
+        except (OSError, ValueError):
+            limit = None
+
+    # cgroup v1 reports "unlimited" as a huge number rather than a marker
+    if limit is None or (total is not None and limit >= total):
+        return total
+    return limit
+
+
+def read_rss(pid: int) -> int:
+    """Resident set size of a process in bytes, 0 if it has already exited."""
+    try:
+        with open(f"/proc/{pid}/status", "r") as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def get_child_pids(pid: int) -> list[int]:
+    children: list[int] = []
+    for path in glob.glob(f"/proc/{pid}/task/*/children"):
+        try:
+            with open(path, "r") as file:
+                children.extend(int(child) for child in file.read().split())
+        except (OSError, ValueError):
+            continue
+    return children
+
+
+class HashGovernor:
+    """
+    Splits a memory budget across the live Stockfish engines.
+
+    Each worker costs a fixed Python overhead and each engine a fixed overhead on top
+    of its Hash table; whatever is left of the budget is shared equally as Hash. While
+    a retired pool drains, the memory its engines still hold is reserved out of the
+    budget, so the new pool does not push the container past its limit; a pool that
+    does not fit even at the minimum Hash has to wait for that memory to be freed.
+    """
+
+    def __init__(
+        self,
+        memory_limit: Optional[int],
+        budget_fraction: float = 0.8,
+        worker_overhead_mb: int = 200,
+        engine_overhead_mb: int = 100,
+        min_hash_mb: int = 16,
+        max_hash_mb: int = 2048,
+    ):
+        self.memory_limit: Optional[int] = memory_limit
+        self.budget_mb: Optional[int] = None if memory_limit is None else int(memory_limit * budget_fraction) // MB
+        self.worker_overhead_mb: int = worker_overhead_mb
+        self.engine_overhead_mb: int = engine_overhead_mb
+        self.min_hash_mb: int = min_hash_mb
+        self.max_hash_mb: int = max_hash_mb
+
+    @staticmethod
+    def from_configuration(
+        memory_limit: Optional[int], configuration: Dict[str, Any], max_hash_mb: int
+    ) -> "HashGovernor":
+        return HashGovernor(
+            memory_limit,
+            budget_fraction=configuration["budget_fraction"],
+            worker_overhead_mb=configuration["worker_overhead_mb"],
+            engine_overhead_mb=configuration["engine_overhead_mb"],
+            min_hash_mb=configuration["min_hash_mb"],
+            max_hash_mb=max_hash_mb,
+        )
+
+    def get_hash_mb(
+        self, workers: int, engines_per_worker: int = 1, engines: Optional[int] = None, reserved_mb: int = 0
+    ) -> int:
+        if self.budget_mb is None:
+            return self.max_hash_mb
+        if engines is None:
+            engines = workers * engines_per_worker
+        free_mb = (
+            self.budget_mb - reserved_mb - workers * self.worker_overhead_mb - engines * self.engine_overhead_mb
+        )
+        hash_mb = free_mb // max(1, engines)
+        return max(self.min_hash_mb, min(self.max_hash_mb, hash_mb))
+
+    def fits(self, workers: int, engines_per_worker: int = 1, reserved_mb: int = 0) -> bool:
+        """Whether a pool of `workers` fits beside `reserved_mb` with every engine at its minimum Hash."""
+        if self.budget_mb is None:
+            return True
+        return self.get_pool_mb(workers, self.min_hash_mb, engines_per_worker) <= self.budget_mb - reserved_mb
+
+    def get_pool_mb(self, workers: int, hash_mb: int, engines_per_worker: int = 1) -> int:
+        """Memory a pool of `workers` holds once its engines have allocated `hash_mb` each."""
+        return workers * (self.worker_overhead_mb + engines_per_worker * (self.engine_overhead_mb + hash_mb))
+
+    def get_max_workers(self, engines_per_worker: int = 1) -> int:
+        """Most workers that still leave every engine its minimum Hash."""
+        if self.budget_mb is None:
+            return 0
+        per_worker_mb = self.worker_overhead_mb + engines_per_worker * (self.engine_overhead_mb + self.min_hash_mb)
+        return max(1, self.budget_mb // per_worker_mb)
+
+
+def report_pool_memory() -> str:
+    """RSS of every pool worker and of the engines it has spawned."""
+    lines: list[str] = []
+    total = 0
+    for worker in multiprocessing.active_children():
+        if worker.pid is None:
+            continue
+        worker_rss = read_rss(worker.pid)
+        engines = [(pid, read_rss(pid)) for pid in get_child_pids(worker.pid)]
+        worker_total = worker_rss + sum(rss for _, rss in engines)
+        total += worker_total
+        engine_summary = ", ".join(f"engine {pid}: {rss // MB} MB" for pid, rss in engines) or "no engines"
+        lines.append(
+            f"  worker {worker.pid}: {worker_rss // MB} MB python, {worker_total // MB} MB total ({engine_summary})"
+        )
+    lines.insert(0, f"Pool memory: {total // MB} MB across {len(lines)} worker(s)")
+    return "\n".join(lines)
@@ -0,0 +1,254 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+SEGMENT_SUFFIX = ".outbox"
+ACKED_SUFFIX = ".acked"
+SEALED_MARKER = {"sealed": True}
+
+
+class PermanentDeliveryError(Exception):
+    """Delivery failed in a way retrying cannot fix; the entry is dropped."""
+
+
+class CircuitBreaker:
+    """
+    Stops delivery while the API keeps failing.
+
+    After `failure_threshold` consecutive failures the circuit opens for `reset_seconds`;
+    then a single trial delivery is let through, which closes the circuit on success
+    or reopens it on failure.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.trial_in_flight or time.monotonic() - self.opened_at < self.reset_seconds:
+                return False
+            self.trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self.lock:
+            if self.opened_at is not None:
+                print("🔌 API is back, resuming puzzle delivery")
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    print(f"🔌 {self.failures} delivery failures in a row, pausing for {self.reset_seconds}s")
+                self.opened_at = time.monotonic()
+
+
+class OutboxWriter:
+    """Appends the puzzles of one job to their own segment file, synced to disk before returning."""
+
+    def __init__(self, directory: str, name: str):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{name}{SEGMENT_SUFFIX}")
+
+    def write_line(self, entry: dict) -> None:
+        with open(self.path, "a") as file:
+            file.write(json.dumps(entry) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    def append(self, payload: dict) -> None:
+        self.write_line(payload)
+
+    def seal(self) -> None:
+        """Mark the segment complete so it can be deleted once every entry is delivered."""
+        self.write_line(SEALED_MARKER)
+
+
+@dataclass
+class Segment:
+    path: str
+    offset: int = 0
+    next_index: int = 0
+    pending: deque = field(default_factory=deque)
+    acked: set = field(default_factory=set)
+    sealed: bool = False
+    in_flight: bool = False
+    updated: float = field(default_factory=time.time)
+
+
+class OutboxDrainer:
+    """
+    Delivers outbox segments in the background.
+
+    Entries of one segment are sent in order, one at a time, so a set's last puzzle
+    never overtakes the others; different segments are sent concurrently. Delivered
+    entry numbers are appended to a sidecar file, which is how a restart knows what
+    is left to replay.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        send: Callable[[dict], None],
+        breaker: CircuitBreaker,
+        concurrency: int = 4,
+        poll_seconds: float = 0.5,
+        stale_seconds: float = 86400.0,
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.send = send
+        self.breaker = breaker
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.stale_seconds = stale_seconds
+        self.segments: dict[str, Segment] = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(concurrency, thread_name_prefix="outbox")
+
+    @staticmethod
+    def from_configuration(directory: str, send: Callable[[dict], None], configuration: dict) -> "OutboxDrainer":
+        return OutboxDrainer(
+            directory,
+            send,
+            CircuitBreaker(configuration["failure_threshold"], configuration["reset_seconds"]),
+            concurrency=configuration["concurrency"],
+            poll_seconds=configuration["poll_seconds"],
+            stale_seconds=configuration["stale_seconds"],
+        )
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.run, name="outbox-drainer", daemon=True)
+        thread.start()
+        return thread
+
+    def run(self) -> None:
+        while True:
+            try:
+                self.scan()
+                self.dispatch()
+            except Exception as e:
+                print(f"[Outbox Error] {e}")
+            time.sleep(self.poll_seconds)
+
+    @property
+    def pending_count(self) -> int:
+        with self.lock:
+            return sum(len(segment.pending) for segment in self.segments.values())
+
+    def scan(self) -> None:
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(SEGMENT_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            with self.lock:
+                segment = self.segments.get(path)
+                if segment is None:
+                    segment = self.segments[path] = Segment(path, acked=self.read_acked(path))
+                self.read_new_entries(segment)
+                if self.is_finished(segment):
+                    self.remove(segment)
+
+    def read_acked(self, path: str) -> set:
+        try:
+            with open(path + ACKED_SUFFIX, "r") as file:
+                return {int(line) for line in file if line.strip()}
+        except FileNotFoundError:
+            return set()
+
+    def read_new_entries(self, segment: Segment) -> None:
+        with open(segment.path, "rb") as file:
+            file.seek(segment.offset)
+            data = file.read()
+        # A writer may be half way through a line; leave it for the next scan
+        complete = data[:data.rfind(b"\n") + 1]
+        if not complete:
+            return
+        segment.offset += len(complete)
+        segment.updated = time.time()
+        for line in complete.decode("utf-8").splitlines():
+            entry = json.loads(line)
+            if entry == SEALED_MARKER:
+                segment.sealed = True
+                continue
+            if segment.next_index not in segment.acked:
+                segment.pending.append((segment.next_index, entry))
+            segment.next_index += 1
+
+    def is_finished(self, segment: Segment) -> bool:
+        if segment.pending or segment.in_flight:
+            return False
+        # Jobs that crashed never seal their segment; they are requeued and write a new one
+        return segment.sealed or time.time() - segment.updated > self.stale_seconds
+
+    def remove(self, segment: Segment) -> None:
+        for path in (segment.path, segment.path + ACKED_SUFFIX):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        del self.segments[segment.path]
+
+    def dispatch(self) -> None:
+        with self.lock:
+            in_flight = sum(segment.in_flight for segment in self.segments.values())
+            for segment in self.segments.values():
+                if in_flight >= self.concurrency:
+                    return
+                if segment.in_flight or not segment.pending or not self.breaker.allow():
+                    continue
+                segment.in_flight = True
+                in_flight += 1
+                self.executor.submit(self.deliver_segment, segment)
+
+    def deliver_segment(self, segment: Segment) -> None:
+        """Send a segment's entries in order until it is empty or the API fails."""
+        try:
+            while segment.pending:
+                index, payload = segment.pending[0]
+                try:
+                    self.send(payload)
+                    self.breaker.record_success()
+                except PermanentDeliveryError as e:
+                    # The API answered, so a rejection still completes a half-open trial
+                    self.breaker.record_success()
+                    print(f"⚠ Dropping {describe(payload)}: {e}")
+                except Exception as e:
+                    print(f"⚠ Error sending {describe(payload)} to API, will retry: {e}")
+                    self.breaker.record_failure()
+                    return
+                self.ack(segment, index)
+                if not self.breaker.allow():
+                    return
+        finally:
+            with self.lock:
+                segment.in_flight = False
+
+    def ack(self, segment: Segment, index: int) -> None:
+        with open(segment.path + ACKED_SUFFIX, "a") as file:
+            file.write(f"{index}\n")
+        with self.lock:
+            segment.pending.popleft()
+            segment.acked.add(index)
+
+
+def describe(payload: dict) -> str:
+    puzzle = payload.get("puzzle")
+    return f"puzzle {puzzle['id']}" if puzzle else f"completion of set {payload.get('setId')}"
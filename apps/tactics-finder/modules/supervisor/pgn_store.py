@@ -0,0 +1,35 @@
+import gzip
+import io
+
+import redis
+
+# Uploads are kept this long at most; a finished job deletes its upload straight away
+PGN_TTL_SECONDS = 7 * 24 * 3600
+
+
+def get_pgn_key(queue: str, set_id: str) -> str:
+    return f"{queue}:pgn:{set_id}"
+
+
+def store_pgn(client: redis.Redis, key: str, pgn: str, ttl: int = PGN_TTL_SECONDS) -> None:
+    """Store an upload gzip-compressed under its own key, for a job to reference by `pgnKey`."""
+    client.set(key, gzip.compress(pgn.encode("utf-8")), ex=ttl)
+
+
+class CleanLines:
+    """
+    Text stream over a gzip-compressed PGN that strips the leading whitespace of each line
+    as it is read, so games are parsed while the upload is decompressed.
+    """
+
+    def __init__(self, blob: bytes):
+        self.stream = io.TextIOWrapper(gzip.GzipFile(fileobj=io.BytesIO(blob)), encoding="utf-8", errors="replace")
+
+    def readline(self) -> str:
+        line = self.stream.readline()
+        if not line:
+            return line
+        return line.lstrip() or "\n"
+
+    def close(self) -> None:
+        self.stream.close()
@@ -0,0 +1,196 @@
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional, Dict, Any
+
+CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_CPU_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_CPU_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+PoolConfig = tuple[int, int]
+
+
+def read_cgroup_cpu_limit() -> Optional[float]:
+    """Return the cgroup CPU quota in cores, or None when the quota is unlimited or unknown."""
+    try:
+        with open(CGROUP_V2_CPU_MAX, "r") as file:
+            quota, period = file.read().split()
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+
+    try:
+        with open(CGROUP_V1_CPU_QUOTA, "r") as file:
+            quota_us = int(file.read())
+        with open(CGROUP_V1_CPU_PERIOD, "r") as file:
+            period_us = int(file.read())
+        return quota_us / period_us if quota_us > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def read_available_cpus() -> int:
+    """Number of cores this process may actually use (affinity mask capped by the cgroup quota)."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    limit = read_cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, int(limit))
+    return max(1, cpus)
+
+
+@dataclass
+class ConfigStats:
+    plies: int = 0
+    seconds: float = 0.0
+    samples: int = 0
+
+    @property
+    def plies_per_second(self) -> float:
+        return self.plies / self.seconds if self.seconds > 0 else 0.0
+
+
+class PoolController:
+    """
+    Chooses the (workers, Stockfish threads) split for the pool.
+
+    Queues of up to `short_queue_length` jobs are served for latency. With a
+    `latency_target_seconds`, they stay on the best measured throughput split as long
+    as it is expected to finish every queued job within the target; otherwise, or
+    without a target, each queued job gets one worker with as many threads as the
+    cores allow, so it finishes sooner. Longer queues are served for throughput: every
+    candidate split is tried until it has enough completed jobs, after which the split
+    with the best measured plies/sec is kept.
+    """
+
+    def __init__(
+        self,
+        cpus: int,
+        short_queue_length: int = 1,
+        min_samples: int = 3,
+        min_dwell_seconds: float = 120.0,
+        switch_gain: float = 0.1,
+        max_workers: int = 0,
+        latency_target_seconds: float = 0.0,
+    ):
+        self.cpus: int = cpus
+        self.short_queue_length: int = short_queue_length
+        self.min_samples: int = min_samples
+        self.min_dwell_seconds: float = min_dwell_seconds
+        self.switch_gain: float = switch_gain
+        self.max_workers: int = max_workers if max_workers > 0 else cpus
+        self.latency_target_seconds: float = latency_target_seconds
+
+        self.candidates: list[PoolConfig] = self.get_candidates()
+        self.stats: dict[PoolConfig, ConfigStats] = {candidate: ConfigStats() for candidate in self.candidates}
+        self.current: Optional[PoolConfig] = None
+        self.changed_at: float = 0.0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def from_configuration(cpus: int, configuration: Dict[str, Any]) -> "PoolController":
+        return PoolController(
+            cpus,
+            short_queue_length=configuration["short_queue_length"],
+            min_samples=configuration["min_samples"],
+            min_dwell_seconds=configuration["min_dwell_seconds"],
+            switch_gain=configuration["switch_gain"],
+            max_workers=configuration["max_workers"],
+            latency_target_seconds=configuration["latency_target_seconds"],
+        )
+
+    def get_candidates(self) -> list[PoolConfig]:
+        candidates: list[PoolConfig] = []
+        for workers in range(1, min(self.cpus, self.max_workers) + 1):
+            threads = self.cpus // workers
+            # Splits that leave the same thread count only add idle cores
+            if candidates and candidates[-1][1] == threads:
+                candidates[-1] = (workers, threads)
+            else:
+                candidates.append((workers, threads))
+        return candidates
+
+    def record(self, config: PoolConfig, plies: int, seconds: float) -> None:
+        """Record a completed job that ran under the given pool configuration."""
+        with self.lock:
+            if config not in self.stats:
+                return
+            stats = self.stats[config]
+            stats.plies += plies
+            stats.seconds += seconds
+            stats.samples += 1
+
+    def throughput(self, config: PoolConfig) -> float:
+        """Estimated plies/sec of the whole pool: every worker runs a job at the measured rate."""
+        return config[0] * self.stats[config].plies_per_second
+
+    def get_latency(self, config: PoolConfig, queue_len: int) -> Optional[float]:
+        """Expected seconds until `queue_len` typical jobs are done on a split, None until it is measured."""
+        stats = self.stats[config]
+        if stats.samples < self.min_samples or stats.plies_per_second == 0:
+            return None
+        jobs = sum(measured.samples for measured in self.stats.values())
+        job_plies = sum(measured.plies for measured in self.stats.values()) / jobs
+        return math.ceil(max(1, queue_len) / config[0]) * job_plies / stats.plies_per_second
+
+    def choose(self, queue_len: int) -> PoolConfig:
+        with self.lock:
+            desired = self.get_short_queue_config(queue_len)
+            if desired is None:
+                desired = self.get_throughput_config(queue_len)
+                # Give a throughput split time to finish jobs before judging it
+                dwelling = time.monotonic() - self.changed_at < self.min_dwell_seconds
+                if self.current is not None and desired != self.current and dwelling:
+                    return self.current
+
+            if desired != self.current:
+                self.current = desired
+                self.changed_at = time.monotonic()
+            return desired
+
+    def get_short_queue_config(self, queue_len: int) -> Optional[PoolConfig]:
+        if queue_len > self.short_queue_length:
+            return None
+        if self.latency_target_seconds > 0:
+            # A split that meets the target anyway keeps its throughput and saves a pool restart
+            meeting = [
+                candidate
+                for candidate in self.candidates
+                if (latency := self.get_latency(candidate, queue_len)) is not None
+                and latency <= self.latency_target_seconds
+            ]
+            if meeting:
+                return max(meeting, key=self.throughput)
+        workers = max(1, queue_len)
+        fitting = [candidate for candidate in self.candidates if candidate[0] <= workers]
+        return fitting[-1]
+
+    def get_throughput_config(self, queue_len: int) -> PoolConfig:
+        usable = [candidate for candidate in self.candidates if candidate[0] <= queue_len] or self.candidates[:1]
+
+        # Explore the widest splits first, as the old fixed table did for long queues
+        unexplored = [candidate for candidate in usable if self.stats[candidate].samples < self.min_samples]
+        if unexplored:
+            if self.current in unexplored:
+                return self.current
+            return unexplored[-1]
+
+        best = max(usable, key=self.throughput)
+        if self.current in usable and self.current != best:
+            if self.throughput(best) < self.throughput(self.current) * (1 + self.switch_gain):
+                return self.current
+        return best
+
+    def report(self) -> str:
+        with self.lock:
+            lines = [
+                f"{workers}x{threads}: {self.throughput((workers, threads)):.1f} plies/s "
+                f"({self.stats[(workers, threads)].samples} jobs)"
+                for workers, threads in self.candidates
+            ]
+        return ", ".join(lines)
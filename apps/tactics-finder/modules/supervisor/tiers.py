@@ -0,0 +1,79 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class QualityTier:
+    """Engine depth, MultiPV and screening settings that one job is analyzed with."""
+
+    name: str
+    depth: int
+    top_moves: int
+    adaptive_multipv: bool
+    mate_search: bool
+
+    @staticmethod
+    def from_configuration(name: str, configuration: dict, stockfish: dict) -> "QualityTier":
+        """Settings a tier leaves out are those of the `stockfish` configuration."""
+        return QualityTier(
+            name=name,
+            depth=configuration["depth"],
+            top_moves=configuration["top_moves"],
+            adaptive_multipv=configuration.get("adaptive_multipv", stockfish["adaptive_multipv"]),
+            mate_search=configuration.get("mate_search", stockfish["mate_search"]),
+        )
+
+    def get_search_options(self) -> dict:
+        """TacticFinder keyword arguments of this tier."""
+        return {
+            "stockfish_top_moves": self.top_moves,
+            "adaptive_multipv": self.adaptive_multipv,
+            "mate_search": self.mate_search,
+        }
+
+
+@dataclass
+class TierPolicy:
+    """
+    Picks the quality tier of a job from the queue backlog and the job's size.
+
+    Tiers are ordered best first. Every `backlog_per_step` jobs waiting per engine
+    move a job one tier down, and a job of more than `large_job_plies` plies one more,
+    so a spike is worked off with shallower puzzles instead of hours of delay. A job
+    that names its tier, such as one the app set for the user, gets that tier.
+    """
+
+    tiers: list[QualityTier]
+    enabled: bool = True
+    backlog_per_step: float = 2.0
+    large_job_plies: int = 0
+
+    @staticmethod
+    def from_configuration(configuration: dict, stockfish: dict) -> "TierPolicy":
+        return TierPolicy(
+            tiers=[
+                QualityTier.from_configuration(name, tier, stockfish)
+                for name, tier in configuration["levels"].items()
+            ],
+            enabled=configuration["enabled"],
+            backlog_per_step=configuration["backlog_per_step"],
+            large_job_plies=configuration["large_job_plies"],
+        )
+
+    def get_tier(self, name: str) -> Optional[QualityTier]:
+        return next((tier for tier in self.tiers if tier.name == name), None)
+
+    def choose(self, backlog: float, plies: int, requested: Optional[str] = None) -> QualityTier:
+        """`backlog` is the number of queued jobs per engine when the job was claimed."""
+        if requested:
+            tier = self.get_tier(requested)
+            if tier is not None:
+                return tier
+            print(f"⚠ Unknown quality tier {requested!r}, choosing one from the load")
+        if not self.enabled:
+            return self.tiers[0]
+
+        steps = int(backlog // self.backlog_per_step) if self.backlog_per_step > 0 else 0
+        if self.large_job_plies and plies > self.large_job_plies:
+            steps += 1
+        return self.tiers[min(steps, len(self.tiers) - 1)]
@@ -0,0 +1,91 @@
+from dataclasses import dataclass
+
+import chess
+import chess.pgn
+
+from modules.converter import GameRecord
+
+DECISIVE_RESULTS = ("1-0", "0-1")
+
+
+@dataclass
+class TriageWeights:
+    """
+    Weights of the cheap signals that predict how many puzzles a game will yield.
+
+    A decisive result, a short game, captures and checks in the last plies and a
+    rating gap all make a game more likely to contain a missed or executed tactic.
+    """
+    decisive_result: float = 2.0
+    short_game: float = 2.0
+    length_reference_plies: int = 80
+    late_window_plies: int = 10
+    late_capture: float = 0.5
+    late_check: float = 0.5
+    rating_gap_per_100: float = 0.5
+    max_rating_gap_bonus: float = 2.0
+
+    @staticmethod
+    def from_configuration(configuration: dict) -> "TriageWeights":
+        return TriageWeights(
+            decisive_result=configuration["decisive_result"],
+            short_game=configuration["short_game"],
+            length_reference_plies=configuration["length_reference_plies"],
+            late_window_plies=configuration["late_window_plies"],
+            late_capture=configuration["late_capture"],
+            late_check=configuration["late_check"],
+            rating_gap_per_100=configuration["rating_gap_per_100"],
+            max_rating_gap_bonus=configuration["max_rating_gap_bonus"],
+        )
+
+
+def get_rating(headers: chess.pgn.Headers, key: str) -> int:
+    try:
+        return int(headers.get(key, ""))
+    except ValueError:
+        return 0
+
+
+def score_game(game: GameRecord, weights: TriageWeights) -> float:
+    """Predicted puzzle yield of a game from its headers and moves, without any engine call."""
+    score = 0.0
+    if game.headers.get("Result") in DECISIVE_RESULTS:
+        score += weights.decisive_result
+
+    board = chess.Board(game.starting_position or chess.STARTING_FEN)
+    moves = [chess.Move.from_uci(move) for move in game.moves]
+    plies = len(moves)
+    if weights.length_reference_plies:
+        score += weights.short_game * max(0.0, 1 - plies / weights.length_reference_plies)
+
+    late_from = plies - weights.late_window_plies
+    for index, move in enumerate(moves):
+        if index >= late_from:
+            if board.is_capture(move):
+                score += weights.late_capture
+            if board.gives_check(move):
+                score += weights.late_check
+        board.push(move)
+
+    white_rating = get_rating(game.headers, "WhiteElo")
+    black_rating = get_rating(game.headers, "BlackElo")
+    if white_rating and black_rating:
+        gap_bonus = abs(white_rating - black_rating) / 100 * weights.rating_gap_per_100
+        score += min(gap_bonus, weights.max_rating_gap_bonus)
+    return score
+
+
+def get_score(game: GameRecord, weights: TriageWeights) -> float:
+    """Score of a game, or 0 for one whose position cannot be set up; its analysis reports the error."""
+    try:
+        return score_game(game, weights)
+    except ValueError as e:
+        print(f"⚠ Could not triage game {game.headers.get('White', '?')} vs {game.headers.get('Black', '?')}: {e}")
+        return 0.0
+
+
+def order_games(games: list[GameRecord], weights: TriageWeights) -> list[GameRecord]:
+    """Games sorted by predicted yield, best first; ties keep their order in the set."""
+    scores = [get_score(game, weights) for game in games]
+    order = sorted(range(len(games)), key=lambda index: -scores[index])
+    return [games[index] for index in order]
@@ -0,0 +1,142 @@
+import os
+import queue
+import time
+from dataclasses import dataclass
+from multiprocessing.queues import Queue
+from typing import Any, Optional
+
+from stockfish import Stockfish
+
+from modules.supervisor.engine_server import ENGINE_SOCKET_VARIABLE, RemoteEngine
+
+# The engine a pool worker launched before it was put into service
+warm_engine: Optional[Stockfish] = None
+# Shared value with the Hash in MB the supervisor wants this pool's engines to use
+hash_target: Any = None
+
+
+@dataclass
+class WarmStart:
+    pid: int
+    import_seconds: float
+    engine_seconds: float
+    error: Optional[str] = None
+
+
+def join_pool(target: Any = None) -> None:
+    """Pool initializer: follow the pool's Hash target, which the supervisor raises once older pools exit."""
+    global hash_target
+    hash_target = target
+
+
+def apply_hash_target(engine) -> None:
+    """Resize the worker's engine when the pool's Hash target has changed since its last job."""
+    if hash_target is None:
+        return
+    hash_mb = str(hash_target.value)
+    if hash_mb == os.environ.get("STOCKFISH_HASH"):
+        return
+    # Engines the worker starts from now on are sized from the environment
+    os.environ["STOCKFISH_HASH"] = hash_mb
+    if engine is not None and not isinstance(engine, RemoteEngine):
+        engine.update_engine_parameters({"Hash": int(hash_mb)})
+
+
+def warm_up(ready: Optional[Queue] = None, target: Any = None) -> None:
+    """
+    Pool initializer: finish every one-off startup cost before the first job arrives.
+
+    Importing the analyzer parses the configuration and loads chess and the engine
+    client; creating the engine runs the UCI handshake, sets the options and allocates
+    the Hash table. A worker whose engine fails to start still joins the pool and falls
+    back to launching an engine per game. Behind an engine server, the worker connects
+    to it instead of launching an engine.
+    """
+    global warm_engine
+    join_pool(target)
+    started = time.monotonic()
+    import modules.finder.analyzer  # noqa: F401
+
+    imported = time.monotonic()
+    error = None
+    try:
+        warm_engine = create_worker_engine()
+    except Exception as e:
+        error = str(e)
+    if ready is not None:
+        ready.put(WarmStart(os.getpid(), imported - started, time.monotonic() - imported, error))
+
+
+def create_worker_engine():
+    from modules.finder.analyzer import create_stockfish
+
+    socket_path = os.environ.get(ENGINE_SOCKET_VARIABLE)
+    if socket_path:
+        return RemoteEngine(socket_path)
+    return create_stockfish()
+
+
+def get_warm_engine() -> Optional[Stockfish]:
+    """The worker's long-lived engine; workers of an engine server connect on first use."""
+    global warm_engine
+    if warm_engine is None and os.environ.get(ENGINE_SOCKET_VARIABLE):
+        warm_engine = create_worker_engine()
+    return warm_engine
+
+
+def quit_engine(engine) -> None:
+    """Stop a worker engine, or disconnect from the engine server."""
+    if isinstance(engine, RemoteEngine):
+        engine.close()
+        return
+    from modules.finder.analyzer import quit_stockfish
+
+    quit_stockfish(engine)
+
+
+def replace_warm_engine(engine) -> Optional[Stockfish]:
+    """
+    Quit the worker's engine after a game failed on it and start another one.
+
+    A failed game can leave the engine crashed or in the middle of a search, and a
+    long-lived engine would then fail every later game of the worker. When the new
+    engine cannot be started either, the worker falls back to an engine per game.
+    """
+    global warm_engine
+    if engine is not None:
+        quit_engine(engine)
+    warm_engine = None
+    try:
+        warm_engine = create_worker_engine()
+    except Exception as e:
+        print(f"[Warm start] Could not restart engine: {e}")
+    return warm_engine
+
+
+def wait_for_warm_start(ready: Queue, workers: int, timeout: float) -> list[WarmStart]:
+    """Collect one report per worker, giving up on the stragglers after `timeout` seconds."""
+    reports: list[WarmStart] = []
+    deadline = time.monotonic() + timeout
+    while len(reports) < workers:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            reports.append(ready.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return reports
+
+
+def report_warm_start(reports: list[WarmStart], workers: int, seconds: float) -> str:
+    if not reports:
+        return f"Warm start: no worker reported ready within {seconds:.1f}s"
+    failed = [report for report in reports if report.error]
+    lines = [
+        f"Warm start: {len(reports)}/{workers} workers ready in {seconds:.1f}s "
+        f"(imports up to {max(report.import_seconds for report in reports):.2f}s, "
+        f"engine launch up to {max(report.engine_seconds for report in reports):.2f}s)"
+    ]
+    for report in failed:
+        lines.append(f"  worker {report.pid} could not start its engine: {report.error}")
+    return "\n".join(lines)
@@ -0,0 +1,136 @@
+import functools
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+
+# Traces are Chrome trace-event JSON: chrome://tracing, Perfetto and speedscope open them
+
+
+class Span:
+    def __init__(self, tracer: "Tracer", name: str, category: str, args: dict):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = 0
+
+    def __enter__(self) -> dict:
+        self.start = time.perf_counter_ns()
+        self.tracer.stack.append(self)
+        return self.args
+
+    def __exit__(self, *exc_info) -> None:
+        end = time.perf_counter_ns()
+        self.tracer.stack.pop()
+        self.tracer.events.append(
+            {
+                "name": self.name,
+                "cat": self.category,
+                "ph": "X",
+                "ts": self.start / 1000,
+                "dur": (end - self.start) / 1000,
+                "pid": self.tracer.pid,
+                "tid": self.tracer.tid,
+                "args": self.args,
+            }
+        )
+
+
+class Tracer:
+    """Records nested spans of one thread, such as job → game → ply → node → engine call."""
+
+    enabled = True
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+        self.events: list[dict] = []
+        self.stack: list[Span] = []
+
+    def span(self, name: str, category: str = "", **args: Any) -> Span:
+        return Span(self, name, category, args)
+
+    def annotate(self, **args: Any) -> None:
+        """Add arguments to the innermost open span."""
+        if self.stack:
+            self.stack[-1].args.update(args)
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as file:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, file)
+
+
+class NullSpan:
+    def __enter__(self) -> dict:
+        return {}
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+class NullTracer:
+    """Stands in while tracing is off, so instrumented code costs next to nothing."""
+
+    enabled = False
+    null_span = NullSpan()
+
+    def span(self, name: str, category: str = "", **args: Any) -> NullSpan:
+        return self.null_span
+
+    def annotate(self, **args: Any) -> None:
+        pass
+
+
+null_tracer = NullTracer()
+local = threading.local()
+
+
+def get_tracer() -> Any:
+    return getattr(local, "tracer", null_tracer)
+
+
+def start_trace() -> Tracer:
+    local.tracer = Tracer()
+    return local.tracer
+
+
+def stop_trace(path: Optional[str] = None) -> None:
+    """Stop tracing this thread, writing the trace to `path` if given."""
+    tracer = getattr(local, "tracer", None)
+    local.tracer = null_tracer
+    if tracer is not None and path:
+        tracer.save(path)
+        print(f"📈 Trace written to {path}")
+
+
+def traced(name: str, category: str = "") -> Callable:
+    """Run the decorated function inside a span; it can add arguments with `annotate`."""
+
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with get_tracer().span(name, category):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def annotate(**args: Any) -> None:
+    get_tracer().annotate(**args)
+
+
+def get_search_nodes(stockfish: Any, method: str) -> Optional[int]:
+    """Nodes searched by the engine's last `method` call, when the client kept its raw output."""
+    lines = getattr(stockfish, "_raw_stockfish_output", {}).get(method)
+    if not lines:
+        return None
+    for line in reversed(lines):
+        parts = line.split(" ")
+        if "nodes" in parts:
+            return int(parts[parts.index("nodes") + 1])
+    return None
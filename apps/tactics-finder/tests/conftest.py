@@ -0,0 +1,8 @@
+import os
+import sys
+
+APP_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, APP_DIRECTORY)
+# Modules read configuration.json relative to the working directory when imported
+os.chdir(APP_DIRECTORY)
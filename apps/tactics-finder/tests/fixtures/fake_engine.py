@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Deterministic stand-in for Stockfish that speaks just enough UCI for the analyzer.
+
+Every legal move is scored by the material the mover keeps after the opponent's best
+reply, plus a small jitter derived from the position. Like Stockfish, scores are for
+the side to move, a deeper search sees longer mates (checking lines only, up to mate
+in 3), `go ... mate N` stops at the first depth that finds a mate within N, and the
+jitter shifts a little with the depth and the number of lines asked for.
+"""
+import hashlib
+import sys
+from typing import Optional
+
+import chess
+
+PIECE_VALUES = {chess.PAWN: 1, chess.KNIGHT: 3, chess.BISHOP: 3, chess.ROOK: 5, chess.QUEEN: 9, chess.KING: 0}
+MAX_MATE = 3
+# Mates against the mover are only looked for this far, which keeps every search fast
+MAX_DEFENDED_MATE = 2
+
+
+def get_material(board: chess.Board) -> int:
+    return sum(
+        PIECE_VALUES[piece.piece_type] * (1 if piece.color == chess.WHITE else -1)
+        for piece in board.piece_map().values()
+    )
+
+
+def get_jitter(*parts: object, modulo: int) -> int:
+    return int(hashlib.md5("|".join(map(str, parts)).encode()).hexdigest()[:4], 16) % modulo
+
+
+def forces_mate(board: chess.Board, moves: int) -> bool:
+    """Whether the side to move mates within `moves` moves, checking on every move."""
+    for move in board.legal_moves:
+        if not board.gives_check(move):
+            continue
+        board.push(move)
+        mated = board.is_checkmate() or (moves > 1 and every_reply_is_mated(board, moves - 1))
+        board.pop()
+        if mated:
+            return True
+    return False
+
+
+def every_reply_is_mated(board: chess.Board, moves: int) -> bool:
+    replies = list(board.legal_moves)
+    if not replies:
+        return False
+    for reply in replies:
+        board.push(reply)
+        mated = forces_mate(board, moves)
+        board.pop()
+        if not mated:
+            return False
+    return True
+
+
+def get_mate(board: chess.Board, limit: int) -> Optional[int]:
+    for moves in range(1, limit + 1):
+        if forces_mate(board, moves):
+            return moves
+    return None
+
+
+def score(board: chess.Board, move: chess.Move, horizon: int, depth: int, multipv: int) -> tuple[str, int]:
+    """UCI score of `move` for the side playing it, seeing mates within `horizon` moves."""
+    gives_check = board.gives_check(move)
+    board.push(move)
+    try:
+        if board.is_checkmate():
+            return "mate", 1
+        if gives_check and horizon > 1:
+            for moves in range(1, horizon):
+                if every_reply_is_mated(board, moves):
+                    return "mate", moves + 1
+        mate_against = get_mate(board, min(horizon, MAX_DEFENDED_MATE))
+        if mate_against is not None:
+            return "mate", -mate_against
+        worst = None
+        for reply in board.legal_moves:
+            board.push(reply)
+            # The mover is to move again, so this is the material from its side
+            value = get_material(board) * (1 if board.turn == chess.WHITE else -1)
+            board.pop()
+            worst = value if worst is None else min(worst, value)
+    finally:
+        board.pop()
+    fen = board.fen()
+    jitter = get_jitter(fen, move, modulo=40) + get_jitter(fen, move, depth, multipv, modulo=5)
+    return "cp", (worst or 0) * 100 + jitter
+
+
+def sort_key(item: tuple[tuple[str, int], chess.Move]) -> int:
+    (kind, value), _ = item
+    if kind == "mate":
+        return 100000 - value if value > 0 else -100000 - value
+    return value
+
+
+def search(board: chess.Board, depth: int, multipv: int, mate: Optional[int]) -> None:
+    if not any(board.legal_moves):
+        send(f"info depth 0 score {'mate 0' if board.is_check() else 'cp 0'}")
+        send("bestmove (none)")
+        return
+    lines: dict[int, list] = {}
+    scored: list = []
+    # Only a mate-bounded search can stop early, so others just report their last depth
+    for iteration in range(1 if mate is not None else depth, depth + 1):
+        horizon = min(MAX_MATE, max(1, iteration // 2))
+        if horizon not in lines:
+            lines[horizon] = sorted(
+                ((score(board, move, horizon, depth, multipv), move) for move in board.legal_moves),
+                key=sort_key,
+                reverse=True,
+            )
+        scored = lines[horizon]
+        for index, ((kind, value), move) in enumerate(scored[:multipv], 1):
+            send(
+                f"info depth {iteration} seldepth {iteration} multipv {index} score {kind} {value} "
+                f"nodes {1000 * iteration} nps 1000 time 1 pv {move.uci()}"
+            )
+        (kind, value), _ = scored[0]
+        if mate is not None and kind == "mate" and 0 < value <= mate:
+            break
+    send(f"bestmove {scored[0][1].uci()}")
+
+
+def send(line: str) -> None:
+    sys.stdout.write(line + "\n")
+    sys.stdout.flush()
+
+
+def main() -> None:
+    board = chess.Board()
+    multipv = 1
+    for line in sys.stdin:
+        parts = line.split()
+        if not parts:
+            continue
+        command = parts[0]
+        if command == "uci":
+            send("id name Stockfish 16 fake")
+            send("option name MultiPV type spin default 1 min 1 max 500")
+            send("uciok")
+        elif command == "isready":
+            send("readyok")
+        elif command == "setoption" and "MultiPV" in parts:
+            multipv = int(parts[-1])
+        elif command == "position":
+            moves_at = parts.index("moves") if "moves" in parts else len(parts)
+            board = chess.Board() if parts[1] == "startpos" else chess.Board(" ".join(parts[2:moves_at]))
+            for move in parts[moves_at + 1:]:
+                board.push_uci(move)
+        elif command == "d":
+            send("")
+            send("Fen: " + board.fen(en_passant="fen"))
+            send("Key: 0")
+            send("Checkers: ")
+        elif command == "go":
+            depth = int(parts[parts.index("depth") + 1]) if "depth" in parts else 1
+            mate = int(parts[parts.index("mate") + 1]) if "mate" in parts else None
+            search(board, depth, multipv, mate)
+        elif command == "quit":
+            break
+
+
+if __name__ == "__main__":
+    main()
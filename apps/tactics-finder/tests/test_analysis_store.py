@@ -0,0 +1,65 @@
+import io
+import json
+import os
+
+import chess.pgn
+
+import modules.finder.analyzer as analyzer_module
+from modules.finder.analysis_store import AnalysisStore, StoredEngine
+from modules.finder.analyzer import Analyzer, create_stockfish
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def read_games() -> list[str]:
+    with open(os.path.join(FIXTURES, "games.pgn")) as file:
+        pgn = io.StringIO(file.read())
+    games = []
+    while (game := chess.pgn.read_game(pgn)) is not None:
+        games.append(game.accept(chess.pgn.StringExporter(headers=True, variations=True, comments=True)))
+    return games
+
+
+def read_expected() -> list:
+    with open(os.path.join(FIXTURES, "expected_tactics.json")) as file:
+        return json.load(file)
+
+
+def analyze(engine, thresholds=None) -> list:
+    return [Analyzer(stockfish=engine, search_options=thresholds)(game) for game in read_games()]
+
+
+def test_remining_the_store_matches_a_fresh_search(monkeypatch, tmp_path):
+    monkeypatch.setattr(analyzer_module, "STOCKFISH_PATH", os.path.join(FIXTURES, "fake_engine.py"))
+    path = str(tmp_path / "store.json.gz")
+    store = AnalysisStore()
+    assert analyze(StoredEngine(store, create_stockfish)) == read_expected()
+    store.save(path)
+
+    # The same thresholds are answered from the store alone
+    engine = StoredEngine(AnalysisStore.load(path), create_stockfish)
+    assert analyze(engine) == read_expected()
+    assert engine.engine is None and engine.misses == 0
+
+    # Stricter material balance only drops tactics, so every position is already stored
+    thresholds = {"min_relative_material_balance": 5}
+    engine = StoredEngine(AnalysisStore.load(path), create_stockfish)
+    assert analyze(engine, thresholds) == analyze(None, thresholds)
+    assert engine.engine is None
+
+
+def test_remining_searches_the_positions_the_store_lacks(monkeypatch, tmp_path):
+    monkeypatch.setattr(analyzer_module, "STOCKFISH_PATH", os.path.join(FIXTURES, "fake_engine.py"))
+    store = AnalysisStore()
+    analyze(StoredEngine(store, create_stockfish))
+    positions = len(store.positions)
+
+    # A lower threshold searches plies the first run turned down, and keeps their answers
+    thresholds = {"centipawn_threshold": 100}
+    engine = StoredEngine(store, create_stockfish)
+    assert analyze(engine, thresholds) == analyze(None, thresholds)
+    assert engine.misses > 0 and len(store.positions) > positions
+
+    engine = StoredEngine(store, create_stockfish)
+    analyze(engine, thresholds)
+    assert engine.misses == 0
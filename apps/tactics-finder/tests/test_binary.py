@@ -0,0 +1,134 @@
+import io
+import os
+
+from anytree import Node, PreOrderIter
+from chess.pgn import Headers
+
+import modules.finder.analyzer as analyzer_module
+from modules.archive import ArchiveWriter, read_archive
+from modules.converter import read_game_record
+from modules.finder.analyzer import Analyzer
+from modules.binary import BinaryReader, BinaryWriter
+from modules.structures.evaluation import Evaluation
+from modules.structures.outcome import Outcome
+from modules.structures.position import Position
+from modules.structures.tactic import Tactic
+from modules.structures.variations import Variations
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+HEADERS = Headers(Event="Test", White="A", Black="B", Result="1-0", ECO="C50")
+
+
+def make_positions() -> list[Position]:
+    return [
+        Position(
+            move="Bxf7+",
+            color=True,
+            evaluation=Evaluation(1.25),
+            fen="r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4",
+            hard=False,
+            material_balance=-2,
+        ),
+        Position(
+            move="Kxf7",
+            color=False,
+            evaluation=Evaluation(-3),
+            fen="r1bqkbnr/pppp1Bpp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 0 4",
+            forced=True,
+            material_balance=300,
+            outcome=Outcome("resolved", "checkmate"),
+        ),
+        Position(move="Ng5+", color=True, evaluation=Evaluation(0.0), fen="8/8/8/8/8/8/8/K6k w - - 0 1"),
+    ]
+
+
+def make_variations() -> Variations:
+    first, second, third = make_positions()
+    root = Node(first)
+    child = Node(second, parent=root)
+    Node(third, parent=child)
+    Node(third, parent=root)
+    return Variations(root=root, headers=HEADERS)
+
+
+def describe_tree(variations: Variations) -> tuple:
+    """Headers, and the positions in pre-order with their number of children, compared by value."""
+    return variations.headers, [(node.name, len(node.children)) for node in PreOrderIter(variations.root)]
+
+
+def describe_tactic(tactic: Tactic) -> dict:
+    """A tactic in the JSON form of its positions and headers."""
+    headers = tactic.headers.__dict__ if tactic.headers is not None else None
+    return {"type": tactic.type, "headers": headers, "positions": [position.to_json() for position in tactic]}
+
+
+def test_position_round_trip():
+    for position in make_positions():
+        writer = BinaryWriter()
+        position.to_binary(writer)
+        assert Position.from_binary(BinaryReader(writer.getvalue())) == position
+
+
+def test_tactic_round_trip():
+    tactic = Tactic(make_positions(), headers=HEADERS, type="checkmate")
+    assert Tactic.from_binary(tactic.to_binary()) == tactic
+
+
+def test_variations_round_trip():
+    variations = make_variations()
+    assert describe_tree(Variations.from_binary(variations.to_binary())) == describe_tree(variations)
+
+
+def test_archive_round_trip():
+    tactic = Tactic(make_positions(), headers=HEADERS, type="checkmate")
+    variations = make_variations()
+    for compress in (True, False):
+        file = io.BytesIO()
+        ArchiveWriter(file, compress=compress).write_all([variations, tactic])
+        file.seek(0)
+        read_variations, read_tactic = read_archive(file)
+        assert describe_tree(read_variations) == describe_tree(variations)
+        assert read_tactic == tactic
+
+
+def test_round_trips_match_the_json_form():
+    tactic = Tactic(make_positions(), headers=HEADERS, type="checkmate")
+    assert describe_tactic(Tactic.from_binary(tactic.to_binary())) == describe_tactic(tactic)
+    variations = make_variations()
+    assert Variations.from_binary(variations.to_binary()).to_json() == variations.to_json()
+
+
+def test_headers_round_trip_without_roster_tags():
+    headers = Headers(Event="Test", FEN="8/8/8/8/8/8/8/K6k w - - 0 1", SetUp="1")
+    del headers["Site"]
+    writer = BinaryWriter()
+    writer.write_headers(headers)
+    read_headers = BinaryReader(writer.getvalue()).read_headers()
+    assert read_headers is not None and read_headers.__dict__ == headers.__dict__
+
+
+def test_analyzer_archives_the_trees_it_finds(monkeypatch):
+    monkeypatch.setattr(analyzer_module, "STOCKFISH_PATH", os.path.join(FIXTURES, "fake_engine.py"))
+    with open(os.path.join(FIXTURES, "games.pgn")) as handle:
+        records = []
+        while (record := read_game_record(handle)) is not None:
+            records.append(record)
+
+    file = io.BytesIO()
+    analyzer = Analyzer(archive=ArchiveWriter(file))
+    found = []
+    for record in records:
+        variations_list, tactic_list = analyzer.find_variations(
+            record.moves, record.starting_position, record.headers
+        )
+        for variations, tactic in zip(variations_list, tactic_list):
+            found += [variations.to_json(), describe_tactic(tactic)]
+    assert found
+
+    file.seek(0)
+    archived = [
+        record.to_json() if isinstance(record, Variations) else describe_tactic(record)
+        for record in read_archive(file)
+    ]
+    assert archived == found
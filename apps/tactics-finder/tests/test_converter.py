@@ -0,0 +1,22 @@
+import io
+
+from modules.converter import read_game_record
+
+PGN = """[Event "Test"]
+[White "A"]
+[Black "B"]
+
+1. e4 e5 2. Qh5 Nc6 3. Bc4 Nf6 4. Qxf7# 1-0
+"""
+
+
+def test_movetext_result_fills_missing_result_tag():
+    record = read_game_record(io.StringIO(PGN))
+    assert record is not None
+    assert record.headers["Result"] == "1-0"
+
+
+def test_result_tag_is_kept():
+    record = read_game_record(io.StringIO('[Result "0-1"]\n\n1. e4 e5 1-0\n'))
+    assert record is not None
+    assert record.headers["Result"] == "0-1"
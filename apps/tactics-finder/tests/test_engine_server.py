@@ -0,0 +1,28 @@
+import threading
+
+from modules.supervisor.engine_server import EngineScheduler
+
+
+class CrashingEngine:
+    def set_fen_position(self, fen: str) -> None:
+        raise RuntimeError("The Stockfish process has crashed")
+
+
+def test_failed_engine_is_quit_before_it_is_replaced(monkeypatch):
+    crashed = CrashingEngine()
+    started = iter([crashed, None])
+    quit = []
+    monkeypatch.setattr(EngineScheduler, "start_engine", staticmethod(lambda index: next(started)))
+    monkeypatch.setattr(EngineScheduler, "quit_engine", staticmethod(quit.append))
+    # Stop once no engine is left, instead of failing requests forever
+    monkeypatch.setattr(EngineScheduler, "fail_requests", lambda self: None)
+
+    scheduler = EngineScheduler(1)
+    runner = threading.Thread(target=scheduler.run_engine, args=(0,), daemon=True)
+    runner.start()
+    reply = scheduler.submit({"fen": "startpos", "moves": [], "depth": 1, "method": "evaluation", "args": []})
+    runner.join(5)
+
+    assert reply == {"error": "The Stockfish process has crashed", "type": "RuntimeError"}
+    assert quit == [crashed]
+    assert scheduler.live_engines == 0
@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+
+from modules.finder.mate_search import MateSearchStockfish, parse_top_moves
+
+
+def split(output: list[str]) -> list[list[str]]:
+    return [line.split(" ") for line in output]
+
+
+def info(depth: int, multipv: int, score: str, move: str) -> str:
+    return f"info depth {depth} seldepth {depth} multipv {multipv} score {score} nodes {depth * 100} pv {move} e7e5"
+
+
+class CannedStockfish(MateSearchStockfish):
+    """Answers `go` with canned engine output instead of running Stockfish."""
+
+    def __init__(self, output: list[str], whites_turn: bool = True, turn_perspective: bool = False):
+        self.output = output
+        self.whites_turn = whites_turn
+        self.turn_perspective = turn_perspective
+        self.commands: list[str] = []
+        self._parameters = SimpleNamespace(multipv=1)
+
+    def __del__(self):
+        pass
+
+    def _set_option(self, name, value, update_parameters_attribute=True):
+        self.commands.append(f"setoption name {name} value {value}")
+        self._parameters.multipv = value
+
+    def _put(self, command):
+        self.commands.append(command)
+
+    def _get_sf_go_command_output(self, store_raw_output_for=None):
+        return self.output
+
+    def get_turn_perspective(self):
+        return self.turn_perspective
+
+    def _is_whites_turn(self):
+        return self.whites_turn
+
+
+def test_lines_come_from_the_last_depth():
+    output = [
+        info(1, 1, "cp 20", "e2e4"),
+        info(1, 2, "cp 10", "d2d4"),
+        info(2, 1, "cp 35", "d2d4"),
+        info(2, 2, "mate -3", "g2g4"),
+        "bestmove d2d4 ponder e7e5",
+    ]
+    assert parse_top_moves(split(output), 1) == [
+        {"Move": "d2d4", "Centipawn": 35, "Mate": None},
+        {"Move": "g2g4", "Centipawn": None, "Mate": -3},
+    ]
+    assert parse_top_moves(split(output), -1)[1] == {"Move": "g2g4", "Centipawn": None, "Mate": 3}
+
+
+def test_incomplete_last_depth_keeps_the_lines_it_has():
+    output = [info(3, 1, "cp 40", "e2e4"), info(3, 2, "cp 15", "g1f3"), info(4, 1, "mate 2", "d1h5")]
+    assert parse_top_moves(split(output + ["bestmove d1h5"]), 1) == [{"Move": "d1h5", "Centipawn": None, "Mate": 2}]
+
+
+def test_no_legal_move_has_no_lines():
+    assert parse_top_moves(split(["info depth 0 score mate 0", "bestmove (none)"]), 1) == []
+
+
+def test_search_stops_at_the_depth_that_finds_the_bounded_mate():
+    output = [
+        info(1, 1, "cp 300", "d1h5"),
+        info(1, 2, "cp 120", "f1c4"),
+        info(2, 1, "mate 2", "d1h5"),
+        info(2, 2, "cp 150", "f1c4"),
+        "bestmove d1h5",
+    ]
+    stockfish = CannedStockfish(output)
+    lines = stockfish.get_top_moves_mate(2, 2, 6)
+
+    assert stockfish.commands == ["setoption name MultiPV value 2", "go depth 6 mate 2", "setoption name MultiPV value 1"]
+    assert lines == [
+        {"Move": "d1h5", "Centipawn": None, "Mate": 2},
+        {"Move": "f1c4", "Centipawn": 150, "Mate": None},
+    ]
+
+
+def test_search_reaches_its_depth_when_the_bound_is_not_met():
+    output = [info(depth, 1, f"cp {-50 - depth}", "e8g8") for depth in range(1, 7)] + ["bestmove e8g8"]
+    stockfish = CannedStockfish(output, whites_turn=False)
+    lines = stockfish.get_top_moves_mate(1, 2, 6)
+
+    assert stockfish.commands == ["go depth 6 mate 2"]
+    # Black is to move, so its score is turned to white's side like Stockfish.get_top_moves does
+    assert lines == [{"Move": "e8g8", "Centipawn": 56, "Mate": None}]
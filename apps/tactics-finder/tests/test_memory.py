@@ -0,0 +1,27 @@
+from modules.supervisor.memory import MB, HashGovernor
+
+
+def test_new_pool_fits_beside_draining_pool():
+    governor = HashGovernor(
+        10_000 * MB, budget_fraction=1.0, worker_overhead_mb=200, engine_overhead_mb=100, max_hash_mb=1500
+    )
+    old_pool_mb = governor.get_pool_mb(4, governor.get_hash_mb(4))
+    assert old_pool_mb == 7200
+
+    new_hash_mb = governor.get_hash_mb(2, reserved_mb=old_pool_mb)
+    assert new_hash_mb == 1100
+    assert old_pool_mb + governor.get_pool_mb(2, new_hash_mb) <= governor.budget_mb
+
+
+def test_new_pool_waits_when_it_cannot_fit_at_minimum_hash():
+    governor = HashGovernor(
+        10_000 * MB, budget_fraction=1.0, worker_overhead_mb=200, engine_overhead_mb=100, min_hash_mb=64
+    )
+    old_pool_mb = governor.get_pool_mb(8, governor.get_hash_mb(8))
+    assert not governor.fits(2, reserved_mb=old_pool_mb)
+    assert governor.fits(2)
+
+    # Once the old pool exits, the new pool's Hash is raised to the whole budget
+    draining_hash_mb = governor.get_hash_mb(1, reserved_mb=governor.budget_mb - 1000)
+    assert draining_hash_mb == 700
+    assert governor.get_hash_mb(1) == 2048
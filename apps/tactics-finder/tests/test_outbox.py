@@ -0,0 +1,43 @@
+from modules.supervisor.outbox import CircuitBreaker, OutboxDrainer, OutboxWriter, PermanentDeliveryError
+
+
+class FlakyApi:
+    def __init__(self):
+        self.up = True
+        self.sent: list[str] = []
+
+    def send(self, payload: dict) -> None:
+        if not self.up:
+            raise ConnectionError("API is down")
+        if payload["puzzle"]["id"] == "bad":
+            raise PermanentDeliveryError("rejected")
+        self.sent.append(payload["puzzle"]["id"])
+
+
+def drain_once(drainer: OutboxDrainer) -> None:
+    drainer.scan()
+    drainer.dispatch()
+    # One delivery thread, so this returns once the dispatched segment is done
+    drainer.executor.submit(lambda: None).result()
+
+
+def test_rejected_trial_delivery_closes_the_circuit(tmp_path):
+    writer = OutboxWriter(str(tmp_path), "job")
+    for puzzle_id in ("bad", "b", "c"):
+        writer.append({"puzzle": {"id": puzzle_id}, "setId": "set"})
+    writer.seal()
+
+    api = FlakyApi()
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.0)
+    drainer = OutboxDrainer(str(tmp_path), api.send, breaker, concurrency=1)
+
+    api.up = False
+    drain_once(drainer)
+    assert breaker.opened_at is not None
+
+    api.up = True
+    drain_once(drainer)
+    assert api.sent == ["b", "c"]
+    assert drainer.pending_count == 0
+    assert not breaker.trial_in_flight
+    assert breaker.opened_at is None
@@ -0,0 +1,55 @@
+import io
+import json
+import os
+
+import chess.pgn
+import pytest
+
+import modules.finder.analyzer as analyzer_module
+from modules.finder.analyzer import Analyzer
+from modules.tracing import start_trace, stop_trace
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def read_games(path: str) -> list[str]:
+    with open(path) as file:
+        pgn = io.StringIO(file.read())
+    games = []
+    while (game := chess.pgn.read_game(pgn)) is not None:
+        games.append(game.accept(chess.pgn.StringExporter(headers=True, variations=True, comments=True)))
+    return games
+
+
+def read_expected() -> list:
+    with open(os.path.join(FIXTURES, "expected_tactics.json")) as file:
+        return json.load(file)
+
+
+@pytest.fixture
+def fake_engine(monkeypatch):
+    monkeypatch.setattr(analyzer_module, "STOCKFISH_PATH", os.path.join(FIXTURES, "fake_engine.py"))
+
+
+def test_fake_engine_finds_the_baseline_tactics(fake_engine):
+    """The analyzer, driven by a deterministic engine, still finds the tactics of the original analysis."""
+    tracer = start_trace()
+    found = [Analyzer()(game) for game in read_games(os.path.join(FIXTURES, "games.pgn"))]
+    stop_trace()
+    assert found == read_expected()
+
+    # The games reach the mate-bounded searches and the lines made for forced nodes
+    assert any(event["name"] == "engine top moves" and event["args"].get("mate") for event in tracer.events)
+    assert any(event["name"] == "forced node" for event in tracer.events)
+
+
+@pytest.mark.parametrize(
+    "search_options",
+    [{"adaptive_multipv": False}, {"mate_search": False}, {"screen_forced_nodes": False}],
+)
+def test_search_shortcuts_do_not_change_the_tactics(fake_engine, search_options):
+    """The fake's lines shift with MultiPV and depth, as Stockfish's do, yet every shortcut keeps the tactics."""
+    found = [
+        Analyzer(search_options=search_options)(game) for game in read_games(os.path.join(FIXTURES, "games.pgn"))
+    ]
+    assert found == read_expected()
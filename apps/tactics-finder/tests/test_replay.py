@@ -0,0 +1,55 @@
+import io
+import json
+import os
+
+import chess.pgn
+import pytest
+
+import modules.finder.analyzer as analyzer_module
+from modules.finder.analyzer import Analyzer, create_stockfish
+from modules.finder.replay import RecordingEngine, ReplayEngine, ReplayMissError
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def read_games() -> list[str]:
+    with open(os.path.join(FIXTURES, "games.pgn")) as file:
+        pgn = io.StringIO(file.read())
+    games = []
+    while (game := chess.pgn.read_game(pgn)) is not None:
+        games.append(game.accept(chess.pgn.StringExporter(headers=True, variations=True, comments=True)))
+    return games
+
+
+def read_expected() -> list:
+    with open(os.path.join(FIXTURES, "expected_tactics.json")) as file:
+        return json.load(file)
+
+
+def test_replay_reproduces_the_recorded_tactics_without_an_engine(monkeypatch, tmp_path):
+    monkeypatch.setattr(analyzer_module, "STOCKFISH_PATH", os.path.join(FIXTURES, "fake_engine.py"))
+    recording = RecordingEngine(create_stockfish())
+    assert [Analyzer(stockfish=recording)(game) for game in read_games()] == read_expected()
+    path = str(tmp_path / "recording.json.gz")
+    recording.save(path)
+
+    # Any attempt to launch an engine now fails, so every answer comes from the recording
+    monkeypatch.setattr(analyzer_module, "STOCKFISH_PATH", str(tmp_path / "missing"))
+    replay = ReplayEngine.load(path)
+    assert [Analyzer(stockfish=replay)(game) for game in read_games()] == read_expected()
+    assert replay.queries > 0
+
+
+def test_replay_refuses_an_analysis_that_leaves_the_recording(monkeypatch, tmp_path):
+    monkeypatch.setattr(analyzer_module, "STOCKFISH_PATH", os.path.join(FIXTURES, "fake_engine.py"))
+    recording = RecordingEngine(create_stockfish())
+    for game in read_games():
+        Analyzer(stockfish=recording)(game)
+    path = str(tmp_path / "recording.json.gz")
+    recording.save(path)
+
+    # A lower threshold starts searches at plies the recorded analysis turned down
+    replay = ReplayEngine.load(path)
+    with pytest.raises(ReplayMissError):
+        for game in read_games():
+            Analyzer(stockfish=replay, search_options={"centipawn_threshold": 100})(game)
@@ -0,0 +1,30 @@
+from modules.supervisor.scaling import PoolController
+
+
+def measure(controller: PoolController, config: tuple[int, int], plies_per_second: float) -> None:
+    for _ in range(controller.min_samples):
+        controller.record(config, 600, 600 / plies_per_second)
+
+
+def test_short_queue_stays_on_the_throughput_split_within_the_latency_target():
+    controller = PoolController(4, short_queue_length=2, latency_target_seconds=100)
+    measure(controller, (4, 1), 10)
+    measure(controller, (1, 4), 25)
+
+    # A lone 600-ply job takes 60s on a 4x1 worker, within the target
+    assert controller.choose(1) == (4, 1)
+
+
+def test_short_queue_gets_the_fastest_split_when_the_target_would_be_missed():
+    controller = PoolController(4, short_queue_length=2, latency_target_seconds=30)
+    measure(controller, (4, 1), 10)
+    measure(controller, (1, 4), 25)
+
+    assert controller.choose(1) == (1, 4)
+
+
+def test_short_queue_without_a_target_gets_the_fastest_split():
+    controller = PoolController(4, short_queue_length=2)
+    measure(controller, (4, 1), 10)
+
+    assert controller.choose(2) == (2, 2)
@@ -0,0 +1,30 @@
+from modules.finder.search_memo import SearchMemo
+
+FEN = "6k1/5ppp/8/8/8/8/5PPP/R5K1 w - - 0 1"
+FULL = [{"Move": "a1a8", "Centipawn": None, "Mate": 1}]
+BOUNDED = [{"Move": "a1a8", "Centipawn": None, "Mate": 1}, {"Move": "g1f1", "Centipawn": 40, "Mate": None}]
+
+
+def test_bounded_lines_only_answer_their_bound():
+    memo = SearchMemo()
+    memo.store(FEN, False, BOUNDED, mate=2)
+    assert memo.get(FEN, False, mate=2) is BOUNDED
+    assert memo.get(FEN, False, mate=3) is None
+    assert memo.get(FEN, False) is None
+
+
+def test_unbounded_lines_answer_any_bound():
+    memo = SearchMemo()
+    memo.store(FEN, False, FULL)
+    assert memo.get(FEN, False, mate=2) is FULL
+    assert memo.get(FEN, False) is FULL
+
+
+def test_evaluation_comes_from_full_searches_only():
+    memo = SearchMemo()
+    memo.store(FEN, True, FULL, searched=False)
+    memo.store(FEN, False, BOUNDED, mate=2)
+    assert memo.get_evaluation(FEN) is None
+
+    memo.store(FEN, False, FULL)
+    assert memo.get_evaluation(FEN) is not None
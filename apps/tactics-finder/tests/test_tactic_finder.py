@@ -0,0 +1,35 @@
+import os
+
+import chess
+
+import modules.finder.analyzer as analyzer_module
+from modules.finder.analyzer import create_stockfish
+from modules.finder.tactic_finder import TacticFinder
+from modules.structures.evaluation import Evaluation
+from modules.structures.position import Position
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+# Philidor's legacy: after 1... a6 2. Nh6+ Kh8 3. Qg8+ Rxg8 4. Nf7#, with every reply forced
+FEN = "5rk1/ppp2Npp/8/8/2Q5/8/PPP2PPP/6K1 b - - 0 1"
+
+
+def test_forced_replies_in_a_mating_net_are_searched_once(monkeypatch):
+    monkeypatch.setattr(analyzer_module, "STOCKFISH_PATH", os.path.join(FIXTURES, "fake_engine.py"))
+    stockfish = create_stockfish()
+    stockfish.set_fen_position(FEN)
+    stockfish.make_moves_from_current_position(["a7a6"])
+    searched = []
+    search_node_top_moves = TacticFinder.search_node_top_moves
+
+    def record_search(finder, defender, mate=None):
+        searched.append(chess.Board(finder.stockfish.get_fen_position()).epd())
+        return search_node_top_moves(finder, defender, mate)
+
+    monkeypatch.setattr(TacticFinder, "search_node_top_moves", record_search)
+    position = Position(move="a7a6", color=False, evaluation=Evaluation(3), fen=FEN)
+    finder = TacticFinder(stockfish, chess.WHITE, starting_position=position)
+    variations, tactic = finder.get_variations()
+
+    assert tactic is not None
+    assert [position.move for position in tactic.positions] == ["a7a6", "f7h6", "g8h8", "c4g8", "f8g8", "h6f7"]
+    assert len(searched) == len(set(searched))
@@ -0,0 +1,21 @@
+from modules.supervisor.tiers import TierPolicy
+
+STOCKFISH = {"adaptive_multipv": False, "mate_search": True}
+
+
+def test_tiers_inherit_unset_search_options():
+    policy = TierPolicy.from_configuration(
+        {
+            "enabled": True,
+            "backlog_per_step": 2,
+            "large_job_plies": 0,
+            "levels": {
+                "full": {"depth": 18, "top_moves": 5},
+                "express": {"depth": 10, "top_moves": 2, "mate_search": False},
+            },
+        },
+        STOCKFISH,
+    )
+    full, express = policy.tiers
+    assert (full.adaptive_multipv, full.mate_search) == (False, True)
+    assert (express.adaptive_multipv, express.mate_search) == (False, False)
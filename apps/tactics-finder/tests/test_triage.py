@@ -0,0 +1,20 @@
+import io
+
+from modules.converter import read_game_record
+from modules.supervisor.triage import TriageWeights, order_games
+
+
+def read_record(pgn: str):
+    record = read_game_record(io.StringIO(pgn))
+    assert record is not None
+    return record
+
+
+def test_malformed_fen_only_demotes_its_game():
+    broken = read_record('[White "Broken"]\n[FEN "not a fen"]\n\n1. e4 e5 1-0\n')
+    decisive = read_record('[White "Decisive"]\n[Result "1-0"]\n\n1. e4 e5 2. Qh5 Nc6 3. Bc4 Nf6 4. Qxf7# 1-0\n')
+    drawn = read_record('[White "Drawn"]\n[Result "1/2-1/2"]\n\n1. Nf3 Nf6 2. Ng1 Ng8 1/2-1/2\n')
+
+    ordered = order_games([broken, decisive, drawn], TriageWeights())
+
+    assert [game.headers["White"] for game in ordered] == ["Decisive", "Drawn", "Broken"]
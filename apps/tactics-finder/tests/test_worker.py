@@ -0,0 +1,72 @@
+import multiprocessing
+import os
+
+import modules.finder.analyzer as analyzer_module
+import modules.supervisor.warmup as warmup
+import worker
+from modules.finder.analyzer import create_stockfish
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def read_fixture_games() -> list:
+    with open(os.path.join(FIXTURES, "games.pgn")) as file:
+        return worker.parse_pgn(file.read())
+
+
+def test_crashed_engine_is_replaced_before_the_next_game(monkeypatch):
+    monkeypatch.setattr(analyzer_module, "STOCKFISH_PATH", os.path.join(FIXTURES, "fake_engine.py"))
+    crashed = create_stockfish()
+    crashed._stockfish.kill()
+    crashed._stockfish.wait()
+    replaced = []
+
+    def replace_engine(failed):
+        replaced.append(failed)
+        return create_stockfish()
+
+    delivered = []
+    worker.analyze_games(read_fixture_games(), "user", "set", crashed, delivered.append, replace_engine=replace_engine)
+
+    assert replaced == [crashed]
+    # Only the game that met the crashed engine is lost; the set is still marked complete after the rest
+    assert len([payload for payload in delivered if "puzzle" in payload]) == 2
+    assert delivered[-1] == worker.build_completion_payload("user", "set")
+
+
+def test_malformed_game_does_not_fail_its_set(monkeypatch):
+    monkeypatch.setattr(analyzer_module, "STOCKFISH_PATH", os.path.join(FIXTURES, "fake_engine.py"))
+    games = worker.parse_pgn('[White "Broken"]\n[FEN "not a fen"]\n\n1. e4 e5 1-0\n') + read_fixture_games()
+
+    delivered = []
+    worker.analyze_games(games, "user", "set", create_stockfish(), delivered.append)
+
+    assert len([payload for payload in delivered if "puzzle" in payload]) == 3
+    assert delivered[-1] == worker.build_completion_payload("user", "set")
+
+
+def test_worker_engine_follows_a_raised_hash_target(monkeypatch):
+    monkeypatch.setattr(analyzer_module, "STOCKFISH_PATH", os.path.join(FIXTURES, "fake_engine.py"))
+    monkeypatch.setenv("STOCKFISH_HASH", "64")
+    engine = create_stockfish()
+    target = multiprocessing.Value("i", 64)
+    monkeypatch.setattr(warmup, "hash_target", target)
+
+    target.value = 256
+    warmup.apply_hash_target(engine)
+
+    assert engine.get_engine_parameters()["Hash"] == 256
+    assert os.environ["STOCKFISH_HASH"] == "256"
+
+
+def test_set_id_cannot_place_files_outside_their_directories(monkeypatch, tmp_path):
+    outbox_dir, trace_dir = tmp_path / "outbox" / "inner", tmp_path / "traces" / "inner"
+    monkeypatch.setattr(worker, "OUTBOX_DIR", str(outbox_dir))
+    monkeypatch.setattr(worker, "TRACE_DIR", str(trace_dir))
+    set_id = "../../escaped/set"
+
+    outbox = worker.open_outbox(set_id)
+    worker.analyze_games([], "user", set_id, deliver=outbox.append, trace=True)
+
+    files = [path for path in tmp_path.rglob("*") if path.is_file()]
+    assert sorted(path.parent for path in files) == [outbox_dir, trace_dir]
@@ -1,15 +1,46 @@
+import asyncio
+import contextlib
 import os
 import redis
+import redis.asyncio as aioredis
 import requests
 import time
 import json
 import io
 import hashlib
+import multiprocessing
+import random
+import socket
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
 from dotenv import load_dotenv
-from multiprocessing import Pool
+from multiprocessing.pool import Pool
+from multiprocessing.queues import Queue
 
-import chess.pgn
 from analyze import analyze_pgn  # Assuming analyzer dependency remains
+from modules.configuration import load_configuration
+from modules.converter import GameRecord, read_game_record
+from modules.finder.move_trie import MoveTrie
+from modules.tracing import get_tracer, start_trace, stop_trace
+from modules.supervisor.coordination import LoadCounter, NodeRegistry, get_processing_queue
+from modules.supervisor.engine_server import ENGINE_SOCKET_VARIABLE, RemoteEngine, start_engine_server
+from modules.supervisor.memory import HashGovernor, read_memory_limit, report_pool_memory
+from modules.supervisor.outbox import OutboxDrainer, OutboxWriter, PermanentDeliveryError
+from modules.supervisor.pgn_store import CleanLines, get_pgn_key, store_pgn
+from modules.supervisor.scaling import PoolController, PoolConfig, read_available_cpus
+from modules.supervisor.tiers import QualityTier, TierPolicy
+from modules.supervisor.triage import TriageWeights, order_games
+from modules.supervisor.warmup import (
+    apply_hash_target,
+    get_warm_engine,
+    join_pool,
+    quit_engine,
+    replace_warm_engine,
+    report_warm_start,
+    wait_for_warm_start,
+    warm_up,
+)
 
 load_dotenv()
 
@@ -19,19 +50,33 @@ load_dotenv()
 REDIS_HOST = os.environ.get("REDIS_HOST", "redis")
 REDIS_PORT = int(os.environ.get("REDIS_PORT", 6379))
 REDIS_QUEUE = os.environ.get("REDIS_QUEUE", "pgn_queue")
-PROCESSING_QUEUE = f"{REDIS_QUEUE}_processing"
+NODE_ID = os.environ.get("NODE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+PROCESSING_QUEUE = get_processing_queue(REDIS_QUEUE, NODE_ID)
+# Single-node workers kept their claimed jobs here before nodes were registered
+LEGACY_PROCESSING_QUEUE = f"{REDIS_QUEUE}_processing"
+HEARTBEAT_INTERVAL = int(os.environ.get("HEARTBEAT_INTERVAL", 5))
 API_URL = os.environ.get(
     "API_ENDPOINT", "http://chess-training-app:3000/api/tactics/addPuzzleToSet"
 )
+WORKER_MODE = os.environ.get("WORKER_MODE", "pool")
+ASYNC_ENGINES = int(os.environ.get("ASYNC_ENGINES", 0))
+ASYNC_PARSE_WORKERS = int(os.environ.get("ASYNC_PARSE_WORKERS", 1))
+OUTBOX_DIR = os.environ.get("OUTBOX_DIR", "outbox")
+TRACE_DIR = os.environ.get("TRACE_DIR", "traces")
+# Hash with a "sample_rate" field; set ids listed in the "<key>:sets" set are always traced
+TRACE_KEY = f"{REDIS_QUEUE}:trace"
 
 redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0)
+registry = NodeRegistry(redis_client, REDIS_QUEUE, NODE_ID, heartbeat_ttl=HEARTBEAT_INTERVAL * 6)
+
+configuration = load_configuration()
+tier_policy = TierPolicy.from_configuration(configuration["tiers"], configuration["stockfish"])
 
 # ---------------------------------------------------------------------------
 # Development Seed
 # ---------------------------------------------------------------------------
 if os.environ.get("ENV") == "development":
-    sample_job = {
-        "pgn": """[Event "FIDE World Cup 2025"]
+    sample_pgn = """[Event "FIDE World Cup 2025"]
 [Site "https://lichess.org/broadcast/fide-world-cup-2025--round-1/game-1/t8DzIZPc/pjFW7Z3B"]
 [Date "2025.10.27"]
 [Round "1.1"]
@@ -39,10 +84,9 @@ if os.environ.get("ENV") == "development":
 [Black "Erdogmus, Yagiz Kaan"]
 [Result "0-1"]
 
-1. e4 f6 2. d4 g5 3. Nf3""",
-        "userId": "dev-user",
-        "setId": "dev-set",
-    }
+1. e4 f6 2. d4 g5 3. Nf3"""
+    sample_job = {"pgnKey": get_pgn_key(REDIS_QUEUE, "dev-set"), "userId": "dev-user", "setId": "dev-set"}
+    store_pgn(redis_client, sample_job["pgnKey"], sample_pgn)
     redis_client.lpush(REDIS_QUEUE, json.dumps(sample_job))
     print(f"Seeded {REDIS_QUEUE} with a sample job")
 
@@ -54,23 +98,21 @@ def clean_pgn(pgn: str) -> str:
     return "\n".join(line.lstrip() for line in pgn.splitlines())
 
 
-def parse_pgn(pgn_content: str) -> list[chess.pgn.Game]:
-    """Parse PGN string to a list of Game objects."""
-    game_objects: list[chess.pgn.Game] = []
+def parse_pgn(pgn_content: str) -> list[GameRecord]:
+    """Parse PGN string to the mainline of each game, in a single pass."""
+    return parse_pgn_stream(io.StringIO(pgn_content))
+
+
+def parse_pgn_stream(pgn_io) -> list[GameRecord]:
+    """Parse an open PGN text stream to the mainline of each game, in a single pass."""
+    game_records: list[GameRecord] = []
     try:
-        pgn_io = io.StringIO(pgn_content)
-        while (game := chess.pgn.read_game(pgn_io)):
-            game_objects.append(game)
-        print(f"Parsed {len(game_objects)} games from PGN.")
+        while (record := read_game_record(pgn_io)):
+            game_records.append(record)
+        print(f"Parsed {len(game_records)} games from PGN.")
     except Exception as e:
         print(f"[parse_pgn] Error parsing PGN: {e}")
-    return game_objects
-
-
-def game_to_pgn_string(game: chess.pgn.Game) -> str:
-    """Convert a chess.pgn.Game object to a PGN string."""
-    exporter = chess.pgn.StringExporter(headers=True, variations=True, comments=True)
-    return game.accept(exporter)
+    return game_records
 
 
 def deterministic_puzzle_id(fen: str, moves: str | None) -> str:
@@ -88,102 +130,338 @@ def deterministic_puzzle_id(fen: str, moves: str | None) -> str:
 # ---------------------------------------------------------------------------
 # Core processing
 # ---------------------------------------------------------------------------
-def generate_and_send_puzzles(
-    game: chess.pgn.Game, user_id: str, set_id: str, is_last_puzzle_of_set: bool
-) -> None:
-    """Generate puzzles from one game and send to API."""
-    try:
-        pgn_string = game_to_pgn_string(game)
+def build_payload(
+    puzzle_data: dict, user_id: str, set_id: str, last_puzzle: bool, tier: Optional[str] = None
+) -> dict:
+    puzzle_id = deterministic_puzzle_id(
+        puzzle_data.get("fen", ""), puzzle_data.get("moves")
+    )
+    return {
+        "puzzle": {
+            "id": puzzle_id,
+            "fen": puzzle_data.get("fen", ""),
+            "moves": puzzle_data.get("moves", ""),
+            "rating": "1500",
+            "directStart": "false",
+            "tier": tier,
+        },
+        "userId": user_id,
+        "setId": set_id,
+        "last_puzzle": last_puzzle,
+    }
 
-        # Lazy import so worker startup is fast
-        from modules.finder.analyzer import Analyzer
 
-        analyzer = Analyzer(user_id=user_id)
-        puzzle_data_list = analyzer(pgn_string)
+def build_completion_payload(user_id: str, set_id: str) -> dict:
+    """Marks a set complete once all its games are analyzed, however many puzzles they yielded."""
+    return {"userId": user_id, "setId": set_id, "last_puzzle": True}
 
-        if not puzzle_data_list:
-            print(f"No puzzles generated for game in set {set_id}.")
-            return
 
-        for i, puzzle_data in enumerate(puzzle_data_list):
-            last_puzzle_for_this_call = (
-                is_last_puzzle_of_set and (i == len(puzzle_data_list) - 1)
-            )
+def send_puzzle(payload: dict) -> None:
+    """POST one puzzle to the API. Raises so the outbox can retry, or drop what the API rejects."""
+    response = requests.post(API_URL, json=payload, timeout=configuration["outbox"]["timeout_seconds"])
+    if 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+        raise PermanentDeliveryError(f"API rejected the puzzle with {response.status_code}")
+    response.raise_for_status()
+    if "puzzle" not in payload:
+        print(f"✔ Marked set {payload['setId']} complete")
+        return
+    print(f"✔ Sent puzzle {payload['puzzle']['id']} for set {payload['setId']}")
 
-            puzzle_id = deterministic_puzzle_id(
-                puzzle_data.get("fen", ""), puzzle_data.get("moves")
-            )
 
-            payload = {
-                "puzzle": {
-                    "id": puzzle_id,
-                    "fen": puzzle_data.get("fen", ""),
-                    "moves": puzzle_data.get("moves", ""),
-                    "rating": "1500",
-                    "directStart": "false",
-                },
-                "userId": user_id,
-                "setId": set_id,
-                "last_puzzle": last_puzzle_for_this_call,
-            }
+def get_set_file_name(set_id: str) -> str:
+    """
+    A file name for a set: the set id comes from the job, so it is hashed rather than
+    put in a path, where `/` or `..` would reach outside the directory.
+    """
+    return hashlib.sha256(set_id.encode()).hexdigest()[:16]
+
+
+def open_outbox(set_id: str) -> OutboxWriter:
+    return OutboxWriter(OUTBOX_DIR, f"{time.time_ns()}-{os.getpid()}-{get_set_file_name(set_id)}")
 
-            try:
-                response = requests.post(API_URL, json=payload, timeout=10)
-                response.raise_for_status()
-                print(
-                    f"✔ Sent puzzle {i+1}/{len(puzzle_data_list)} "
-                    f"for set {set_id} (last={last_puzzle_for_this_call})"
-                )
-            except requests.Timeout:
-                print(f"⏱ Timeout sending puzzle {puzzle_id} to API  -  continuing")
-            except requests.RequestException as e:
-                print(f"⚠ Error sending puzzle {puzzle_id} to API: {e}")
+
+def generate_and_send_puzzles(
+    game: GameRecord,
+    user_id: str,
+    set_id: str,
+    stockfish=None,
+    deliver: Callable[[dict], None] = send_puzzle,
+    trie: Optional[MoveTrie] = None,
+    tier: Optional[QualityTier] = None,
+) -> bool:
+    """
+    Generate puzzles from one game and hand each one to `deliver` as soon as it is found.
+    Returns False when the game failed, which can leave `stockfish` crashed or mid-search.
+    """
+    tier_name = tier.name if tier else None
+    delivered = 0
+    try:
+        # Lazy import so worker startup is fast; prewarmed pools have it imported already
+        from modules.finder.analyzer import Analyzer
+
+        if tier is None:
+            analyzer = Analyzer(user_id=user_id, stockfish=stockfish, trie=trie)
+        else:
+            analyzer = Analyzer(
+                user_id=user_id,
+                stockfish=stockfish,
+                trie=trie,
+                stockfish_depth=tier.depth,
+                search_options=tier.get_search_options(),
+            )
+        white, black = game.headers.get("White", "?"), game.headers.get("Black", "?")
+        with get_tracer().span("game", "analysis", white=white, black=black, plies=len(game.moves)):
+            for puzzle_data in analyzer.stream_record(game):
+                deliver(build_payload(puzzle_data, user_id, set_id, False, tier_name))
+                delivered += 1
 
     except Exception as e:
         print(f"❌ ERROR generating puzzles for game in set {set_id}: {e}")
+        return False
 
+    if not delivered:
+        print(f"No puzzles generated for game in set {set_id}.")
+    return True
 
-def process_job(job: dict) -> None:
-    """Worker job handler."""
-    pgn_content = clean_pgn(job.get("pgn", ""))
+
+def read_job(job: dict) -> Optional[tuple[str, str]]:
+    """Validate a job and return its (userId, setId)."""
+    has_pgn = bool(job.get("pgnKey")) or bool(clean_pgn(job.get("pgn", "")))
     user_id = job.get("userId")
     set_id = job.get("setId")
 
-    if not pgn_content or not user_id or not set_id:
-        print("⚠ Job missing required fields (pgn/userId/setId)")
-        return
+    if not has_pgn or not user_id or not set_id:
+        print("⚠ Job missing required fields (pgnKey or pgn/userId/setId)")
+        return None
+    return user_id, set_id
+
+
+def parse_job_pgn(job: dict, blob: Optional[bytes | str] = None) -> list[GameRecord]:
+    """
+    Games of a job. Jobs reference their upload by `pgnKey`, stored gzip-compressed and
+    parsed as it is decompressed; jobs queued before that carry the PGN inline.
+    """
+    if not job.get("pgnKey"):
+        return parse_pgn(clean_pgn(job["pgn"]))
+    if blob is None:
+        print(f"⚠ PGN {job['pgnKey']} of set {job['setId']} has expired or was never stored")
+        return []
+    # The Redis clients do not decode responses, so a stored upload is read as raw bytes
+    assert isinstance(blob, bytes), "PGN upload was decoded"
+    return parse_pgn_stream(CleanLines(blob))
+
+
+def choose_tier(job: dict, game_list: list[GameRecord]) -> QualityTier:
+    """Quality tier of a job, from the backlog when it was claimed, its size and its own `tier` field."""
+    plies = sum(len(game.moves) for game in game_list)
+    tier = tier_policy.choose(job.get("backlog", 0.0), plies, job.get("tier"))
+    print(
+        f"[Worker] Set {job['setId']}: {plies} plies, "
+        f"{job.get('backlog', 0.0):.1f} jobs waiting per engine → {tier.name} tier"
+    )
+    return tier
+
+
+def should_trace(job: dict) -> bool:
+    """
+    Whether to record a trace of this job. Toggled at runtime, without a restart:
+    a job can ask for it, a set can be listed, or a sample of all jobs traced.
+    """
+    if job.get("trace"):
+        return True
+    try:
+        if job.get("setId") and redis_client.sismember(f"{TRACE_KEY}:sets", job["setId"]):
+            return True
+        sample_rate = redis_client.hget(TRACE_KEY, "sample_rate")
+        return sample_rate is not None and random.random() < float(sample_rate)
+    except (redis.RedisError, ValueError) as e:
+        print(f"⚠ Could not read trace settings: {e}")
+        return False
+
+
+def analyze_games(
+    game_list: list[GameRecord],
+    user_id: str,
+    set_id: str,
+    stockfish=None,
+    deliver: Callable[[dict], None] = send_puzzle,
+    trace: bool = False,
+    tier: Optional[QualityTier] = None,
+    replace_engine: Optional[Callable[[Any], Any]] = None,
+) -> int:
+    """
+    Analyze every game of a set, most promising first, then mark the set complete.
+    Returns the number of plies analyzed. The games share a move trie, so a ply that
+    several games reach by the same moves is analyzed once.
+    With `trace`, a span trace of the job is written to TRACE_DIR. After a game fails,
+    `replace_engine` swaps the long-lived engine for a new one before the next game.
+    """
+    if configuration["triage"]["enabled"]:
+        game_list = order_games(game_list, TriageWeights.from_configuration(configuration["triage"]))
+    trie = MoveTrie()
+    plies = 0
+    if trace:
+        start_trace()
+    try:
+        tier_name = tier.name if tier else None
+        with get_tracer().span("job", "analysis", set_id=set_id, games=len(game_list), tier=tier_name) as span:
+            for game in game_list:
+                succeeded = generate_and_send_puzzles(game, user_id, set_id, stockfish, deliver, trie, tier)
+                if not succeeded and stockfish is not None and replace_engine is not None:
+                    stockfish = replace_engine(stockfish)
+                plies += len(game.moves)
+            span.update(
+                analyzed_plies=trie.analyzed_plies, reused_plies=trie.reused_plies, decided_plies=trie.gated_plies
+            )
+    finally:
+        if trace:
+            stop_trace(os.path.join(TRACE_DIR, f"{get_set_file_name(set_id)}-{time.time_ns()}.json"))
+    # The outbox sends a segment in order, so this follows every puzzle of the set
+    deliver(build_completion_payload(user_id, set_id))
+    print(f"Set {set_id}: {trie}")
+    return plies
+
+
+def process_job(job: dict) -> Optional[tuple[int, float]]:
+    """Worker job handler. Returns (plies analyzed, seconds taken) for pool tuning."""
+    fields = read_job(job)
+    if fields is None:
+        return None
+    user_id, set_id = fields
 
     print(f"[Worker] Processing job for set {set_id}")
-    game_list = parse_pgn(pgn_content)
-    for i, game in enumerate(game_list):
-        is_last = i == len(game_list) - 1
-        generate_and_send_puzzles(game, user_id, set_id, is_last)
+    started = time.monotonic()
+    priority = time.time()
+
+    def start_job_engine(failed=None):
+        stockfish = get_warm_engine() if failed is None else replace_warm_engine(failed)
+        if isinstance(stockfish, RemoteEngine):
+            # The engine server serves the oldest job first
+            stockfish.priority = priority
+        return stockfish
+
+    stockfish = start_job_engine()
+    apply_hash_target(stockfish)
+    game_list = parse_job_pgn(job, redis_client.get(job["pgnKey"]) if job.get("pgnKey") else None)
+    outbox = open_outbox(set_id)
+    tier = choose_tier(job, game_list)
+    plies = analyze_games(
+        game_list, user_id, set_id, stockfish, outbox.append, job.get("trace", False), tier, start_job_engine
+    )
+    outbox.seal()
     print(f"[Worker] Completed set {set_id}")
+    return plies, time.monotonic() - started
 
 
 # ---------------------------------------------------------------------------
 # Redis queue coordination
 # ---------------------------------------------------------------------------
-def choose_pool_config(queue_len: int) -> tuple[int, int]:
-    """Decide pool size and Stockfish threads based on queue load."""
-    if queue_len <= 1:
-        return 1, 6
-    elif queue_len <= 3:
-        return 2, 4
-    elif queue_len <= 6:
-        return 4, 2
-    else:
-        return 6, 1
+def start_outbox_drainer() -> OutboxDrainer:
+    """Deliver what previous runs left in the outbox and everything written from now on."""
+    drainer = OutboxDrainer.from_configuration(OUTBOX_DIR, send_puzzle, configuration["outbox"])
+    drainer.start()
+    return drainer
+
+
+def outbox_is_full(drainer: OutboxDrainer) -> bool:
+    """Backpressure: stop claiming jobs while the API is far behind the engines."""
+    return drainer.pending_count >= configuration["outbox"]["max_pending"]
+
+
+def start_pool(workers: int, hash_target: Any = None) -> Pool:
+    """
+    Start a pool whose workers are ready to analyze when this returns.
+
+    With prewarming on, the analyzer is imported here so forked workers inherit it, and
+    every worker launches its engine in the pool initializer; the supervisor waits for
+    them before handing the pool any job. Workers resize their engines to `hash_target`,
+    a shared value, whenever it has changed before a job.
+    """
+    if not configuration["pool"]["prewarm"]:
+        return Pool(workers, initializer=join_pool, initargs=(hash_target,))
+
+    import modules.finder.analyzer  # noqa: F401
+
+    started = time.monotonic()
+    ready: Queue = multiprocessing.Queue()
+    pool = Pool(workers, initializer=warm_up, initargs=(ready, hash_target))
+    reports = wait_for_warm_start(ready, workers, configuration["pool"]["prewarm_timeout_seconds"])
+    print(report_warm_start(reports, workers, time.monotonic() - started))
+    return pool
+
+
+def get_server_engines(cpus: int) -> int:
+    return configuration["engine_server"]["engines"] or cpus
+
+
+def start_engines(governor: HashGovernor, cpus: int) -> PoolConfig:
+    """
+    Start the shared engine server and return the fixed pool split that keeps it busy.
+
+    Workers only do the Python side of the analysis and send every search to the
+    server, so there are more workers than engines to cover their bookkeeping time.
+    """
+    server_configuration = configuration["engine_server"]
+    engines = get_server_engines(cpus)
+    workers = engines * server_configuration["workers_per_engine"]
+    hash_mb = governor.get_hash_mb(workers + 1, engines=engines)
+    os.environ["STOCKFISH_THREADS"] = "1"
+    os.environ["STOCKFISH_HASH"] = str(hash_mb)
+    start_engine_server(
+        server_configuration["socket_path"],
+        engines,
+        server_configuration["report_interval_seconds"],
+        server_configuration["startup_timeout_seconds"],
+    )
+    os.environ[ENGINE_SOCKET_VARIABLE] = server_configuration["socket_path"]
+    print(f"Engine server → {engines} engines with {hash_mb} MB Hash each, serving {workers} workers")
+    return workers, 1
+
+
+def retire_pool(pool: Pool) -> threading.Thread:
+    """Stop feeding a pool and let its in-flight jobs finish in the background; the thread ends with the pool."""
+    pool.close()
+    draining = threading.Thread(target=pool.join, daemon=True)
+    draining.start()
+    return draining
+
+
+def decode_reply(reply: bytes | str) -> str:
+    """Text of a Redis reply; the clients do not decode responses, so replies are bytes."""
+    return reply.decode("utf-8") if isinstance(reply, bytes) else reply
+
+
+def release_job(job_data: str, job: dict) -> None:
+    """Drop a finished job from the processing queue, along with its stored upload."""
+    redis_client.lrem(PROCESSING_QUEUE, 1, job_data)
+    if job.get("pgnKey"):
+        redis_client.delete(job["pgnKey"])
+
+
+def start_heartbeat(capacity: int, load: LoadCounter) -> threading.Thread:
+    """
+    Heartbeat from a thread of its own, so this node stays registered while the
+    supervisor waits on a starting pool; otherwise other nodes would requeue its jobs.
+    """
+
+    def beat() -> None:
+        while True:
+            try:
+                registry.heartbeat(capacity, load.value)
+            except Exception as e:
+                print(f"[Supervisor Error] {e}")
+            time.sleep(HEARTBEAT_INTERVAL)
+
+    heartbeat = threading.Thread(target=beat, name="heartbeat", daemon=True)
+    heartbeat.start()
+    return heartbeat
 
 
 def requeue_stuck_jobs() -> None:
-    """Move unfinished jobs from processing queue back to main queue on startup."""
-    stuck_jobs = redis_client.lrange(PROCESSING_QUEUE, 0, -1)
-    for job_data in stuck_jobs:
-        redis_client.rpush(REDIS_QUEUE, job_data)
-        redis_client.lrem(PROCESSING_QUEUE, 1, job_data)
+    """Move unfinished jobs of this node's previous run back to the main queue on startup."""
+    stuck_jobs = registry.requeue(PROCESSING_QUEUE) + registry.requeue(LEGACY_PROCESSING_QUEUE)
     if stuck_jobs:
-        print(f"♻ Requeued {len(stuck_jobs)} stuck job(s) from previous run")
+        print(f"♻ Requeued {stuck_jobs} stuck job(s) from previous run")
     else:
         print("✅ No stuck jobs found")
 
@@ -192,51 +470,322 @@ def requeue_stuck_jobs() -> None:
 # Main loop
 # ---------------------------------------------------------------------------
 def main() -> None:
-    print(f"Worker listening on Redis queue: {REDIS_QUEUE}")
+    print(f"Worker {NODE_ID} listening on Redis queue: {REDIS_QUEUE}")
+
+    governor = HashGovernor.from_configuration(
+        read_memory_limit(),
+        configuration["memory"],
+        max_hash_mb=configuration["stockfish"]["parameters"]["Hash"],
+    )
+    pool_configuration = dict(configuration["pool"])
+    memory_max_workers = governor.get_max_workers()
+    if memory_max_workers:
+        configured_max_workers = pool_configuration["max_workers"] or memory_max_workers
+        pool_configuration["max_workers"] = min(configured_max_workers, memory_max_workers)
+    controller = PoolController.from_configuration(read_available_cpus(), pool_configuration)
+    print(
+        f"Detected {controller.cpus} usable CPU(s), "
+        f"{governor.budget_mb} MB memory budget, candidate splits: {controller.candidates}"
+    )
+
+    # Behind an engine server the pool split is fixed by the number of engines
+    server_config: Optional[PoolConfig] = None
+    if configuration["engine_server"]["enabled"]:
+        server_config = start_engines(governor, controller.cpus)
 
     pool = None
-    active_workers = 0
+    pool_config: Optional[PoolConfig] = None
+    # Memory of the current pool, and of retired pools still finishing their jobs
+    pool_mb = 0
+    draining_pools: list[tuple[threading.Thread, int]] = []
+    # Hash of the current pool's engines, shared with its workers so it can be raised
+    hash_target: Any = None
+    # Jobs this node runs at once at most, advertised to other nodes and used as its claim limit
+    capacity = server_config[0] if server_config else controller.candidates[-1][0]
+    load = LoadCounter()
+    memory_reported_at = time.monotonic()
+    drainer = start_outbox_drainer()
     requeue_stuck_jobs()
+    start_heartbeat(capacity, load)
 
     while True:
         try:
-            queue_len = redis_client.llen(REDIS_QUEUE)
-            desired_workers, sf_threads = choose_pool_config(queue_len)
+            if time.monotonic() - memory_reported_at > configuration["memory"]["report_interval_seconds"]:
+                print(report_pool_memory())
+                memory_reported_at = time.monotonic()
 
-            if desired_workers != active_workers:
+            # Size the pool for this node's share of the backlog across every registered node
+            queue_len = redis_client.llen(REDIS_QUEUE)
+            desired_config = server_config or controller.choose(registry.get_share(queue_len, capacity, load.value))
+
+            if not server_config and any(not draining.is_alive() for draining, _ in draining_pools):
+                # Give the memory of retired pools that have exited to the current pool
+                draining_pools = [(draining, mb) for draining, mb in draining_pools if draining.is_alive()]
+                if pool_config:
+                    reserved_mb = sum(mb for _, mb in draining_pools)
+                    hash_mb = governor.get_hash_mb(pool_config[0], reserved_mb=reserved_mb)
+                    if hash_mb > hash_target.value:
+                        print(f"Retired pools have exited, raising Hash to {hash_mb} MB")
+                        hash_target.value = hash_mb
+                        pool_mb = governor.get_pool_mb(pool_config[0], hash_mb)
+
+            if desired_config != pool_config:
+                desired_workers, sf_threads = desired_config
+                retiring_mb = pool_mb
+                if server_config:
+                    print(f"Starting pool → {desired_workers} workers on the engine server")
+                else:
+                    reserved_mb = retiring_mb + sum(mb for _, mb in draining_pools)
+                    if not governor.fits(desired_workers, reserved_mb=reserved_mb):
+                        # Rather than exceed the budget, stop the old pool and wait for memory to be freed
+                        if pool:
+                            print(f"Waiting for retired pools to free memory for {desired_workers} workers")
+                            draining_pools.append((retire_pool(pool), retiring_mb))
+                            pool, pool_config, pool_mb = None, None, 0
+                        time.sleep(0.2)
+                        continue
+                    hash_mb = governor.get_hash_mb(desired_workers, reserved_mb=reserved_mb)
+                    pool_mb = governor.get_pool_mb(desired_workers, hash_mb)
+                    print(
+                        f"Scaling pool → {desired_workers} workers, "
+                        f"{sf_threads} Stockfish threads and {hash_mb} MB Hash each"
+                    )
+                    os.environ["STOCKFISH_THREADS"] = str(sf_threads)
+                    os.environ["STOCKFISH_HASH"] = str(hash_mb)
+                    hash_target = multiprocessing.Value("i", hash_mb)
+                # The old pool keeps its in-flight jobs until the new one is ready
+                new_pool = start_pool(desired_workers, hash_target)
                 if pool:
-                    pool.terminate()
-                    pool.join()
-                print(
-                    f"Scaling pool → {desired_workers} workers, "
-                    f"{sf_threads} Stockfish threads each"
-                )
-                os.environ["STOCKFISH_THREADS"] = str(sf_threads)
-                pool = Pool(desired_workers)
-                active_workers = desired_workers
+                    draining_pools.append((retire_pool(pool), retiring_mb))
+                    print(f"Measured throughput: {controller.report()}")
+                    print(report_pool_memory())
+                pool = new_pool
+                pool_config = desired_config
+
+            # Only claim a job when an engine is free, so idle nodes can take the rest
+            if load.value >= pool_config[0] or outbox_is_full(drainer):
+                time.sleep(0.2)
+                continue
 
             # Move job atomically from main queue to processing queue
-            job_data = redis_client.brpoplpush(REDIS_QUEUE, PROCESSING_QUEUE, timeout=1)
+            reply = redis_client.brpoplpush(REDIS_QUEUE, PROCESSING_QUEUE, timeout=1)
 
-            if not job_data:
+            if not reply:
                 time.sleep(0.2)
                 continue
 
-            job = json.loads(job_data.decode("utf-8"))
+            # Redis encodes the text back to the same bytes when the job is released
+            job_data = decode_reply(reply)
+            job = json.loads(job_data)
+
+            def done_callback(result, job_data=job_data, job=job, job_config=pool_config):
+                release_job(job_data, job)
+                load.decrement()
+                if result:
+                    plies, seconds = result
+                    controller.record(job_config, plies, seconds)
 
-            def done_callback(_):
-                redis_client.lrem(PROCESSING_QUEUE, 1, job_data)
+            def error_callback(error, job_data=job_data, job=job):
+                print(f"❌ Job failed: {error}")
+                release_job(job_data, job)
+                load.decrement()
 
-            pool.apply_async(process_job, (job,), callback=done_callback)
+            job["trace"] = should_trace(job)
+            job["backlog"] = registry.get_backlog(max(0, queue_len - 1), capacity)
+            load.increment()
+            assert pool is not None, "pool is started before the first job"
+            pool.apply_async(process_job, (job,), callback=done_callback, error_callback=error_callback)
 
         except Exception as e:
             print(f"[Supervisor Error] {e}")
             time.sleep(1)
 
 
+# ---------------------------------------------------------------------------
+# Asyncio supervisor
+# ---------------------------------------------------------------------------
+engine_local = threading.local()
+
+
+def start_thread_engine() -> None:
+    from modules.finder.analyzer import create_stockfish
+
+    engine_local.stockfish = create_stockfish()
+
+
+def replace_thread_engine(stockfish) -> Any:
+    """Quit the thread's engine after a game failed on it and start another; see replace_warm_engine."""
+    quit_engine(stockfish)
+    engine_local.stockfish = None
+    try:
+        start_thread_engine()
+    except Exception as e:
+        print(f"[Warm start] Could not restart engine: {e}")
+    return engine_local.stockfish
+
+
+def analyze_games_on_thread_engine(
+    game_list: list[GameRecord],
+    user_id: str,
+    set_id: str,
+    deliver: Callable[[dict], None],
+    trace: bool = False,
+    tier: Optional[QualityTier] = None,
+) -> int:
+    """Engine executor entry point: each thread keeps one Stockfish alive across jobs."""
+    if getattr(engine_local, "stockfish", None) is None:
+        start_thread_engine()
+    return analyze_games(
+        game_list, user_id, set_id, engine_local.stockfish, deliver, trace, tier, replace_thread_engine
+    )
+
+
+def warm_up_thread_engine() -> None:
+    """Engine executor initializer; an engine that fails here is retried on the thread's first job."""
+    try:
+        start_thread_engine()
+    except Exception as e:
+        print(f"[Warm start] Could not start engine: {e}")
+
+
+def prewarm_engine_threads(engine_executor: ThreadPoolExecutor, engines: int) -> None:
+    """Start every engine thread and its Stockfish before the first job is claimed."""
+    started = time.monotonic()
+    # Each task waits for the others, which forces the executor to start one thread per engine
+    barrier = threading.Barrier(engines)
+    futures = [engine_executor.submit(barrier.wait) for _ in range(engines)]
+    for future in futures:
+        future.result()
+    print(f"Warm start: {engines} engines ready in {time.monotonic() - started:.1f}s")
+
+
+async def run_job_async(
+    job_data: str,
+    backlog: float,
+    client: aioredis.Redis,
+    engine_executor: ThreadPoolExecutor,
+    parse_executor: ProcessPoolExecutor,
+) -> None:
+    loop = asyncio.get_running_loop()
+    job: dict = {}
+    try:
+        job = json.loads(job_data)
+        job["backlog"] = backlog
+        fields = read_job(job)
+        if fields is None:
+            return
+        user_id, set_id = fields
+        trace = await asyncio.to_thread(should_trace, job)
+
+        print(f"[Worker] Processing job for set {set_id}")
+        blob = await client.get(job["pgnKey"]) if job.get("pgnKey") else None
+        game_list = await loop.run_in_executor(parse_executor, parse_job_pgn, job, blob)
+        tier = choose_tier(job, game_list)
+
+        # Engine threads only append to the outbox, so the next game starts without waiting on HTTP
+        outbox = open_outbox(set_id)
+        await loop.run_in_executor(
+            engine_executor, analyze_games_on_thread_engine, game_list, user_id, set_id, outbox.append, trace, tier
+        )
+        outbox.seal()
+        print(f"[Worker] Completed set {set_id}")
+    except Exception as e:
+        print(f"[Supervisor Error] {e}")
+    finally:
+        await client.lrem(PROCESSING_QUEUE, 1, job_data)
+        if job.get("pgnKey"):
+            await client.delete(job["pgnKey"])
+
+
+async def heartbeat_async(engines: int, running: set[asyncio.Task]) -> None:
+    while True:
+        try:
+            await asyncio.to_thread(registry.heartbeat, engines, len(running))
+        except Exception as e:
+            print(f"[Supervisor Error] {e}")
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+
+async def async_main() -> None:
+    """
+    Drive several engines from one Python process.
+
+    Redis polling is a cooperative task on the event loop; each engine is driven by its
+    own executor thread, which spends its time blocked on the engine pipe, PGN parsing
+    goes to a small process pool and puzzles leave through the outbox drainer.
+    """
+    cpus = read_available_cpus()
+    engines = ASYNC_ENGINES or cpus
+    sf_threads = max(1, cpus // engines)
+    governor = HashGovernor.from_configuration(
+        read_memory_limit(),
+        configuration["memory"],
+        max_hash_mb=configuration["stockfish"]["parameters"]["Hash"],
+    )
+    hash_mb = governor.get_hash_mb(workers=1, engines_per_worker=engines)
+    os.environ["STOCKFISH_THREADS"] = str(sf_threads)
+    os.environ["STOCKFISH_HASH"] = str(hash_mb)
+    print(
+        f"Worker {NODE_ID} listening on Redis queue: {REDIS_QUEUE} (asyncio mode, {engines} engines, "
+        f"{sf_threads} Stockfish threads and {hash_mb} MB Hash each)"
+    )
+
+    drainer = start_outbox_drainer()
+    requeue_stuck_jobs()
+    client = aioredis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0)
+    free_engines = asyncio.Semaphore(engines)
+    running: set[asyncio.Task] = set()
+    heartbeat = asyncio.create_task(heartbeat_async(engines, running))
+
+    prewarm = configuration["pool"]["prewarm"]
+    try:
+        with ThreadPoolExecutor(
+            engines, thread_name_prefix="engine", initializer=warm_up_thread_engine if prewarm else None
+        ) as engine_executor, ProcessPoolExecutor(ASYNC_PARSE_WORKERS) as parse_executor:
+            if prewarm:
+                await asyncio.to_thread(prewarm_engine_threads, engine_executor, engines)
+            while True:
+                await free_engines.acquire()
+                if outbox_is_full(drainer):
+                    free_engines.release()
+                    await asyncio.sleep(0.2)
+                    continue
+                try:
+                    reply = await client.brpoplpush(REDIS_QUEUE, PROCESSING_QUEUE, timeout=1)
+                except Exception as e:
+                    print(f"[Supervisor Error] {e}")
+                    reply = None
+                    await asyncio.sleep(1)
+
+                if not reply:
+                    free_engines.release()
+                    continue
+
+                try:
+                    backlog = registry.get_backlog(await client.llen(REDIS_QUEUE), engines)
+                except Exception as e:
+                    print(f"[Supervisor Error] {e}")
+                    backlog = 0.0
+
+                task = asyncio.create_task(
+                    run_job_async(decode_reply(reply), backlog, client, engine_executor, parse_executor)
+                )
+                running.add(task)
+                task.add_done_callback(running.discard)
+                task.add_done_callback(lambda _: free_engines.release())
+    finally:
+        # Stop advertising this node once it no longer takes jobs
+        heartbeat.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await heartbeat
+
+
 # ---------------------------------------------------------------------------
 # Entrypoint
 # ---------------------------------------------------------------------------
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if WORKER_MODE == "asyncio":
+        asyncio.run(async_main())
+    else:
+        main()
\ No newline at end of file
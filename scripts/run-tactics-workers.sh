@@ -0,0 +1,52 @@
+#!/bin/bash
+# run-tactics-workers.sh
+# Starts N tactics-finder worker nodes on this machine against one Redis queue.
+#
+# Usage: scripts/run-tactics-workers.sh [N]   (default 2)
+#
+# Every node gets a stable NODE_ID and its own outbox directory, so a restarted
+# node requeues its own unfinished jobs and delivers what its outbox still holds.
+# When taskset is available the usable CPUs are split between the nodes, since
+# each node sizes its pool from the CPUs it may use. Redis comes from REDIS_HOST
+# and REDIS_PORT (default localhost:6379), e.g. `docker compose up -d redis`.
+# Every node budgets its engine Hash from the memory of the whole machine, so for
+# more than one node lower memory.budget_fraction in configuration.json to about
+# 0.8 / N. Ctrl+C stops every node.
+
+N="${1:-2}"
+ROOT_DIR="$(cd "$(dirname "$0")/.." && pwd)"
+FINDER_DIR="$ROOT_DIR/apps/tactics-finder"
+PYTHON="${PYTHON:-python3}"
+
+if ! [[ "$N" =~ ^[1-9][0-9]*$ ]]; then
+  echo "Error: expected a number of workers, got '$N'"
+  exit 1
+fi
+
+export REDIS_HOST="${REDIS_HOST:-localhost}"
+export REDIS_PORT="${REDIS_PORT:-6379}"
+
+CPUS=$(nproc)
+CPUS_PER_NODE=$((CPUS / N))
+if command -v taskset > /dev/null && [ "$CPUS_PER_NODE" -ge 1 ]; then
+  PIN=1
+else
+  PIN=0
+  echo "Not pinning nodes to CPUs; every node will size its pool from all $CPUS CPUs"
+fi
+
+cd "$FINDER_DIR" || exit 1
+trap 'kill $(jobs -p) 2> /dev/null' INT TERM
+
+for ((i = 0; i < N; i++)); do
+  NODE_ID="$(hostname)-node-$i"
+  COMMAND=(env NODE_ID="$NODE_ID" OUTBOX_DIR="outbox/node-$i" TRACE_DIR="traces/node-$i" "$PYTHON" -u worker.py)
+  if [ "$PIN" -eq 1 ]; then
+    FIRST_CPU=$((i * CPUS_PER_NODE))
+    COMMAND=(taskset -c "$FIRST_CPU-$((FIRST_CPU + CPUS_PER_NODE - 1))" "${COMMAND[@]}")
+  fi
+  echo "Starting $NODE_ID against $REDIS_HOST:$REDIS_PORT"
+  "${COMMAND[@]}" > >(sed -u "s/^/[node-$i] /") 2>&1 &
+done
+
+wait